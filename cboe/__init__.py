@@ -2,14 +2,14 @@
 
 """Read and process futures data from CBOE. Note that the current timezone is assumed to be CBOE's time (America/Chicago), avoiding the use of timezone-aware timestamps that Pandas does not support in computations."""
 
+import concurrent.futures
 import datetime
+import functools
+import glob
 import numpy as np
 import pandas as pd
 from cboe.holiday import USMarketHolidayCalendar
 from pandas.tseries.offsets import CDay,Day,Week,MonthBegin,MonthEnd
-from pandas import ExcelWriter
-from pandas import plotting
-plotting.register_matplotlib_converters()
 import pytz
 import calendar
 import re
@@ -17,15 +17,18 @@ import pickle
 import sys
 import os
 import logging
-import multiprocessing
-import queue
+import io
+import requests
+from urllib3.util.retry import Retry
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
 # References to the US Federal Government Holiday Calendar and current time.
 calendar_us = USMarketHolidayCalendar()
-bday_us     = CDay(calendar=calendar_us)
+holidays_us = USMarketHolidayCalendar.holidays_d64() # For NumPy's business-day functions (e.g., np.busday_count).
+bday_us     = CDay(holidays=holidays_us) # Reuse the expanded holidays rather than re-evaluating the calendar's rules.
 now_utc     = pd.to_datetime('now', utc=True) # Timezone-aware.
 now_tz      = now_utc.tz_convert('America/Chicago') # Needed to calculate today's date in Chicago time.
 now         = now_utc.astimezone('America/Chicago').replace(tzinfo=None) # Timezone-naive date and time in Chicago time (pd.Timestamp)
@@ -33,32 +36,135 @@ today       = pd.to_datetime(now.date()) # Timezone-naive date in Chicago time (
 # Miscellaneous
 max_retries = 10 # Give up after `max_retries` failures to contact CBOE.
 timeout_sec = 10 # Timeout in seconds when contacting CBOE
-delay_sec   = 1 # Delay in seconds between requests to CBOE. Note that this value is factored out of timeout so that delay can be greater than the specified timeout. In other words, total timeout is the sum of `timeout_sec` and `delay_sec`.
-
-def read_csv(q, *argv, **kwargs):
+delay_sec   = 1 # Delay in seconds between requests to CBOE, enforced across all worker threads (see throttle). Note that this value is factored out of timeout so that delay can be greater than the specified timeout. In other words, total timeout is the sum of `timeout_sec` and `delay_sec`.
+max_workers = 8 # Maximum number of contracts fetched concurrently.
+# HTTP session shared by all requests to CBOE, reusing connections (and their TLS handshakes). Responses are gzip-compressed when the server supports it.
+session     = requests.Session()
+session.mount('https://', requests.adapters.HTTPAdapter(
+    pool_maxsize=max_workers,
+    max_retries=Retry(total=None, connect=0, read=False, status=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], raise_on_status=False), # Only transient server errors are retried here; timeouts still reach the callers' retry loops, and the last response is still checked by raise_for_status().
+    ))
+try:
+    import pyarrow # Enables the columnar (Feather/Parquet) cache formats.
+    cache_ext       = 'feather'
+    table_cache_ext = 'parquet' # For dataframes whose index must be kept.
+except ImportError:
+    cache_ext       = 'p' # Fall back to pickle.
+    table_cache_ext = 'p'
+vx_continuous_df_cache_file = 'vx_continuous_df.{}'.format(table_cache_ext)
+cache_read_errors           = (OSError, EOFError, ValueError, AttributeError, ImportError, pickle.UnpicklingError) # Missing, truncated, or unreadable cache (see read_cache).
+cache_write_errors          = (OSError, ValueError, TypeError, ImportError, pickle.PicklingError) # Unwritable cache or unsupported column types (see write_cache).
+
+request_lock     = threading.Lock() # Guards `last_request_sec`.
+last_request_sec = float('-inf') # time.monotonic() at which the latest request to CBOE started.
+
+def throttle():
+    """
+    Block until at least `delay_sec` has passed since the previous request to CBOE
+    started, from any thread. Concurrent callers are released one at a time,
+    `delay_sec` apart, while their downloads may still overlap.
     """
-    Multiprocessing wrapper call to Pandas read_csv. Needed to enforce timeout on pd.read_csv().
+    global last_request_sec
+    with request_lock:
+        wait_sec = last_request_sec + delay_sec - time.monotonic()
+        if(wait_sec > 0):
+            time.sleep(wait_sec)
+        last_request_sec = time.monotonic()
+#END: throttle
+
+def read_csv(url, line_filter=None, **kwargs):
+    """
+    Download a CSV file and parse it with Pandas read_csv. Connections to the host
+    are reused across calls (see `session`) and a timeout is enforced on each request.
 
     Parameters
     ----------
-    q : multiprocessing.Queue()
-        A queue to push results of pd.read_csv() into.
+    url : str
+        URL of the CSV file.
+
+    line_filter : callable
+        Optional predicate on each raw line (bytes) after the first. Lines for
+        which it returns False are dropped before parsing.
 
-    Remaining arguments are identical to that of pandas.read_csv()
+    Remaining keyword arguments are identical to that of pandas.read_csv()
 
     Returns
     -------
-    None
+    pd.DataFrame
+
+    Raises
+    ------
+    requests.Timeout, requests.ConnectionError
+        Transient network failures, which callers retry.
+
+    requests.HTTPError
+    """
+    throttle()
+    r = session.get(url, timeout=timeout_sec)
+    r.raise_for_status()
+    content = r.content
+    if(line_filter is not None):
+        # Prefilter rows so that Pandas only parses the ones of interest.
+        lines   = content.splitlines()
+        content = b'\n'.join(lines[:1] + [line for line in lines[1:] if line_filter(line)])
+    return(pd.read_csv(io.BytesIO(content), **kwargs))
+#END: read_csv
+
+def read_cache(cache_path):
     """
-    time.sleep(delay_sec)
-    results = None
+    Load a dataframe from cache. The format is determined by the file extension:
+    '.feather' or '.parquet' (requires pyarrow) or '.p' (pickle).
+
+    Parameters
+    ----------
+    cache_path : str
+        File path to cache.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if(cache_path.endswith('.feather')):
+        return(pd.read_feather(cache_path))
+    if(cache_path.endswith('.parquet')):
+        return(pd.read_parquet(cache_path))
+    with open(cache_path, 'rb') as f:
+        return(pickle.load(f))
+#END: read_cache
+
+def write_cache(df, cache_path):
+    """
+    Store a dataframe to cache. The format is determined by the file extension:
+    '.feather' or '.parquet' (requires pyarrow) or '.p' (pickle). Feather does not
+    store the dataframe's index, so it is reset; Parquet keeps it. The cache is written to a temporary file
+    first and then moved into place so that readers never see a partial file.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe to cache.
+
+    cache_path : str
+        File path to cache.
+    """
+    tmp_path = '{}.tmp'.format(cache_path)
     try:
-        results = pd.read_csv(*argv, **kwargs)
-    except:
-        logger.exception('Failed to fetch CSV.')
+        if(cache_path.endswith('.feather')):
+            df.reset_index(drop=True).to_feather(tmp_path)
+        elif(cache_path.endswith('.parquet')):
+            df.to_parquet(tmp_path, compression='zstd')
+        else:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        # Do not leave a partial file behind.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         raise
-    q.put(results)
-#END: read_csv
+#END: write_cache
 
 def is_business_day(date):
     """
@@ -74,7 +180,7 @@ def is_business_day(date):
     bool
         Date is a business day.
     """
-    return(len(pd.date_range(start=date, end=date, freq=bday_us)) > 0)
+    return(bool(np.is_busday(pd.Timestamp(date).to_datetime64().astype('datetime64[D]'), holidays=holidays_us)))
 #END: is_business_day
 
 # References to CBOE's historical futures data.
@@ -88,8 +194,14 @@ cboe_vx_adj_date         = datetime.datetime(2007, 3, 23)
 #                  n    b    r    r    y    n    l    g    p    t    v    c
 month_code = ['', 'F', 'G', 'H', 'J', 'K', 'M', 'N', 'Q', 'U', 'V', 'X', 'Z']
 #             0    1    2    3    4    5    6    7    8    9   10   11   12
+p_monthly_vx_symbol = re.compile(r'^VX/') # Monthly VX symbols in CBOE's daily settlement data (weeklies are VX##/...).
 cboe_historical_index_base_url = 'https://cdn.cboe.com/api/global/us_indices/daily_prices'
 cboe_index = {'VIX' : 'VIX_History.csv', 'VIX6M' : 'VIX6M_History.csv'}
+p_yahoo_quote = { # Last price of each index on its Yahoo! Finance quote page (other fields share the tag).
+    index : re.compile(
+        r'<fin-streamer(?=[^>]*?\sdata-symbol="\^{}")(?=[^>]*?\sdata-field="regularMarketPrice")[^>]*>\s*([0-9.,]+)\s*</fin-streamer>'.format(re.escape(index)).encode('ascii'))
+    for index in cboe_index
+    }
 
 # Time when CBOE updates historical futures data.
 cboe_historical_update_time     = pd.to_timedelta('10:00:00') # Chicago time
@@ -205,18 +317,32 @@ def fetch_vx_contracts(period, force_update=False):
         end=(period[-1] + num_active_vx_contracts*MonthBegin()),
         freq='MS',
         )
-    logger.debug('months =\n{}'.format(months))
+    logger.debug('months =\n%s', months)
 
-    # Load VX contracts.
-    vx_contracts = [fetch_vx_monthly_contract(d, force_update=force_update) for d in months]
+    # Load VX contracts concurrently (mostly waiting on CBOE or disk).
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        vx_contracts = list(executor.map(
+            lambda d: fetch_vx_monthly_contract(d, force_update=force_update),
+            months
+            ))
 
     # Merge homogeneous dataframes (contracts) into a single dataframe, indexed by trading day.
-    vx_contract_df = pd.concat(vx_contracts).set_index('Trade Date', drop=True)
-    logger.debug('vx_contract_df (unfiltered)=\n{}'.format(vx_contract_df))
+    # Columns are stitched together as arrays so that the result is assembled only once.
+    columns = {
+        name: np.concatenate([vx_contract[name].values for vx_contract in vx_contracts])
+        for name in vx_contracts[0].columns
+        }
+    trade_dates    = pd.DatetimeIndex(columns.pop('Trade Date'), name='Trade Date')
+    vx_contract_df = pd.DataFrame(columns, index=trade_dates)
+    logger.debug('vx_contract_df (unfiltered)=\n%s', vx_contract_df)
 
     # Exclude invalid entries and entries outside the target timeframe.
     #vx_contract_df = vx_contract_df.loc[period] #XXX: Results in KeyError due to missing entries for some dates.
-    vx_contract_df = vx_contract_df.loc[str(period[0]):str(period[-1])] # Slice by start-to-end dates. Accept CBOE's data as-is.
+    # Slice by start-to-end dates with a mask: the index holds duplicate dates
+    # and is not monotonic across contracts, so label slicing/reindexing is unreliable.
+    # Accept CBOE's data as-is.
+    trade_dates    = vx_contract_df.index
+    vx_contract_df = vx_contract_df[(trade_dates >= period[0]) & (trade_dates <= period[-1])]
     vx_contract_df = vx_contract_df.dropna()
 
     # Fetch today's daily settlement if posted (check current time).
@@ -270,9 +396,9 @@ def fetch_vx_monthly_contract(monthyear, cache=True, force_update=False, cache_d
     """
     code = month_code[monthyear.month]
     contract_name = '({}){:%m/%Y}'.format(code, monthyear)
-    logger.debug('Fetching futures contract {}.'.format(contract_name))
+    logger.debug('Fetching futures contract %s.', contract_name)
 
-    cache_path    = '{}/VX_{:%Y_%m}.p'.format(cache_dir, monthyear)
+    cache_path    = '{}/VX_{:%Y_%m}.{}'.format(cache_dir, monthyear, cache_ext)
     vx_expdate    = get_vx_expiration_date(monthyear)
 
     try:
@@ -284,15 +410,15 @@ def fetch_vx_monthly_contract(monthyear, cache=True, force_update=False, cache_d
         # Disable cache if cache directory is inaccessible.
         cache = False
 
-    try:
-        # Load contract from cache.
-        if(not cache):
-            raise
-        vx_contract = pickle.load(open(cache_path, 'rb'))
-        if(force_update or not is_cboe_cache_current(vx_contract, vx_expdate, cache_path)):
-            raise
-        logger.debug('Retrieved VX contract {} from cache ({}).'.format(contract_name, cache_path))
-    except:
+    vx_contract = None
+    if(cache and not force_update and is_cboe_cache_current(vx_expdate, cache_path)):
+        try:
+            # Load contract from cache.
+            vx_contract = read_cache(cache_path)
+            logger.debug('Retrieved VX contract %s from cache (%s).', contract_name, cache_path)
+        except cache_read_errors:
+            logger.exception('Failed to load VX contract %s from cache (%s).', contract_name, cache_path)
+    if(vx_contract is None):
         # Fallback to fetching from CBOE.
         if monthyear < cboe_vx_new_start_date: # Must get older data from CBOE's old site.
             url = '{}/CFE_{}{:%y}_VX.csv'.format(cboe_old_historical_base_url, code, monthyear)
@@ -302,33 +428,24 @@ def fetch_vx_monthly_contract(monthyear, cache=True, force_update=False, cache_d
         retry_attempt = max_retries
         vx_contract = None
         while try_again and retry_attempt > 0:
-            q = multiprocessing.Queue()
-            p = multiprocessing.Process(
-                target=read_csv,
-                args=(q, url),
-                kwargs=dict(
+            try:
+                vx_contract = read_csv(
+                    url,
                     header=1,
                     names=['Trade Date','Futures','Open','High','Low','Close','Settle',
                         'Change','Total Volume','EFP','Open Interest']
-                    ),
-                )
-            p.start()
-            try:
-                vx_contract = q.get(True, timeout_sec + delay_sec)
+                    )
                 try_again = False
-            except queue.Empty: # timed out
-                p.terminate()
-                p.join()
-                logger.debug('Timed out. Retrying...')
-            except:
-                logger.exception('Failed to download VX contract {} from {}.'.format(contract_name, url))
+            except (requests.Timeout, requests.ConnectionError): # timed out or connection dropped (transient)
+                logger.debug('Timed out or lost connection. Retrying...', exc_info=True)
+            except (requests.RequestException, ValueError): # HTTP error or unparsable CSV (pd.errors.ParserError).
+                logger.exception('Failed to download VX contract %s from %s.', contract_name, url)
                 raise
-            p.join()
             retry_attempt -= 1
         if try_again:
             raise TimeoutError('Failed to retrieve contract {} from {}.'.format(contract_name, url))
             return None
-        logger.debug('Retrieved VX contract {} from {}.'.format(contract_name, vx_contract))
+        logger.debug('Retrieved VX contract %s from %s.', contract_name, vx_contract)
         try:
             if monthyear < cboe_vx_new_start_date: # Must get older data from CBOE's old site.
                 # Parse dates (assuming MM/DD/YYYY format).
@@ -336,7 +453,7 @@ def fetch_vx_monthly_contract(monthyear, cache=True, force_update=False, cache_d
             else: # Get data from CBOE's new site.
                 # Parse dates (assuming YYYY-MM-DD format).
                 vx_contract['Trade Date'] = pd.to_datetime(vx_contract['Trade Date'], format='%Y-%m-%d')
-        except:
+        except (KeyError, ValueError):
             logger.exception('Unexpected datetime format from CBOE.')
             raise
 
@@ -350,26 +467,37 @@ def fetch_vx_monthly_contract(monthyear, cache=True, force_update=False, cache_d
         vx_contract.loc[vx_contract['Trade Date'] < cboe_vx_adj_date, 'Open']   /= 10.0
         vx_contract.loc[vx_contract['Trade Date'] < cboe_vx_adj_date, 'Close']  /= 10.0
 
-        logger.debug('Retrieved contract {} from CBOE.'.format(contract_name))
+        logger.debug('Retrieved contract %s from CBOE.', contract_name)
 
         try:
             if(cache):
                 # Cache VX contract.
-                pickle.dump(vx_contract, open(cache_path, 'wb'))
-                logger.debug('Cached contract {} in ({}).'.format(contract_name, cache_path))
-        except:
-            logger.exception('Failed to cache VX contract {}.'.format(contract_name))
+                write_cache(vx_contract, cache_path)
+                logger.debug('Cached contract %s in (%s).', contract_name, cache_path)
+        except cache_write_errors:
+            logger.exception('Failed to cache VX contract %s.', contract_name)
 
     vx_contract['Expiration Date'] = vx_expdate
 
-    logger.debug('Sample trade date = {}'.format(vx_contract['Trade Date'][0]))
-    logger.debug('vx_contract =\n{}'.format(vx_contract))
+    logger.debug('Sample trade date = %s', vx_contract['Trade Date'][0])
+    logger.debug('vx_contract =\n%s', vx_contract)
     return(vx_contract)
 #END: fetch_vx_monthly_contract
 
-def fetch_vx_daily_settlement():
+def fetch_vx_daily_settlement(cache=True, cache_dir='.data'):
     """
-    Read today's monthly VX settlement values from CBOE.
+    Read today's monthly VX settlement values from CBOE or local cache. The cache
+    is reused only if it was written after CBOE posted the day's settlement values
+    (see `cboe_daily_update_datetime`), so that reruns on the same day skip the
+    download. Settlement caches from earlier days are removed.
+
+    Parameters
+    ----------
+    cache : bool
+        Enable cache.
+
+    cache_dir : str
+        Cache's base directory path.
 
     Returns
     -------
@@ -406,97 +534,116 @@ def fetch_vx_daily_settlement():
     #    ...
     csv_url = '{}/csv?dt={:%Y-%m-%d}'.format(cboe_current_base_url, today)
     html_url = cboe_current_base_url
-    all_eod_values = None
-    try_again = True
-    retry_attempt = max_retries
-    while try_again and retry_attempt > 0:
-        q = multiprocessing.Queue()
-        p = multiprocessing.Process(
-            target=read_csv,
-            args=(q, csv_url),
-            kwargs=dict(
-                header=0,
-                names=['Product', 'Symbol', 'Expiration Date', 'Price']
-                ),
-            )
-        p.start()
+    cache_path = '{}/VX_settlement_{:%Y_%m_%d}.{}'.format(cache_dir, today, cache_ext)
+
+    try:
+        # Setup cache directory
+        os.mkdir(cache_dir)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Disable cache if cache directory is inaccessible.
+        cache = False
+
+    vx_eod_values = None
+    fetched       = False
+    if(cache and is_cboe_cache_current(cboe_daily_update_datetime, cache_path)): # Values may change until CBOE posts them.
         try:
-            all_eod_values = q.get(True, timeout_sec + delay_sec)
-            try_again = False
-        except queue.Empty: # timed out
-            p.terminate()
-            p.join()
-            logger.debug('Timed out. Retrying...')
-        except:
-            logger.exception('Failed to download daily settlement values from CBOE.\ncsv_url = {}\nhtml_url = {}'.format(csv_url, html_url))
-            raise
-        p.join()
-        retry_attempt -= 1
-    if try_again:
-        raise TimeoutError('Failed to retrieve data from CSV at {}.'.format(csv_url))
-        return None
-    logger.debug('Fetched data from CSV at {}.'.format(csv_url))
+            vx_eod_values = read_cache(cache_path)
+            logger.debug('Retrieved daily settlement values from cache (%s).', cache_path)
+        except cache_read_errors:
+            logger.exception('Failed to load daily settlement values from cache (%s).', cache_path)
+    if(vx_eod_values is None):
+        all_eod_values = None
+        try_again = True
+        retry_attempt = max_retries
+        while try_again and retry_attempt > 0:
+            try:
+                all_eod_values = read_csv(
+                    csv_url,
+                    line_filter=is_vx_settlement_line,
+                    header=0,
+                    names=['Product', 'Symbol', 'Expiration Date', 'Price']
+                    )
+                try_again = False
+            except (requests.Timeout, requests.ConnectionError): # timed out or connection dropped (transient)
+                logger.debug('Timed out or lost connection. Retrying...', exc_info=True)
+            except (requests.RequestException, ValueError): # HTTP error or unparsable CSV (pd.errors.ParserError).
+                logger.exception('Failed to download daily settlement values from CBOE.\ncsv_url = %s\nhtml_url = %s', csv_url, html_url)
+                raise
+            retry_attempt -= 1
+        if try_again:
+            raise TimeoutError('Failed to retrieve data from CSV at {}.'.format(csv_url))
+            return None
+        logger.debug('Fetched data from CSV at %s.', csv_url)
 
-    logger.debug('all_eod_values =\n' + str(all_eod_values))
-    vx_eod_values = all_eod_values[all_eod_values['Product'] == 'VX']
-    logger.debug('vx_eod_values =\n' + str(vx_eod_values))
+        logger.debug('all_eod_values =\n%s', all_eod_values)
+        vx_eod_values = all_eod_values[all_eod_values['Product'] == 'VX']
+        logger.debug('vx_eod_values =\n%s', vx_eod_values)
+        fetched = True
 
     # Grab the front and back month expirations and settlement prices.
-    p_monthly_expdate      = re.compile('VX\/(.*)')
-    monthly_vx_eod_values  = pd.DataFrame(
-            vx_eod_values[
-                vx_eod_values['Symbol'].apply(lambda x: p_monthly_expdate.match(x) is not None)
-            ])
-    try:
-        front_month_eod_value = monthly_vx_eod_values.iloc[0]
-        back_month_eod_value  = monthly_vx_eod_values.iloc[1]
-        month4_eod_value      = monthly_vx_eod_values.iloc[3]
-        month5_eod_value      = monthly_vx_eod_values.iloc[4]
-        month6_eod_value      = monthly_vx_eod_values.iloc[5]
-        month7_eod_value      = monthly_vx_eod_values.iloc[6]
-    except:
-        logger.exception('Failed to find monthly contract settlement data.')
-        raise
+    monthly_vx_eod_values  = vx_eod_values[vx_eod_values['Symbol'].str.match(p_monthly_vx_symbol)].copy()
+    if(len(monthly_vx_eod_values) < 7): # front month through m7
+        logger.error('Failed to find monthly contract settlement data.')
+        raise IndexError('Found {} monthly contracts; expected at least 7.'.format(len(monthly_vx_eod_values)))
 
-    logger.debug('type(monthly_vx_eod_values) = {}'.format(type(monthly_vx_eod_values)))
-    logger.debug('monthly_vx_eod_values =\n{}'.format(monthly_vx_eod_values))
+    if(cache and fetched):
+        # Cache today's settlement values (only once they look complete) and drop those of earlier days.
+        try:
+            write_cache(vx_eod_values, cache_path)
+            logger.debug('Cached daily settlement values in (%s).', cache_path)
+        except cache_write_errors:
+            logger.exception('Failed to cache daily settlement values.')
+        for old_cache_path in glob.glob('{}/VX_settlement_*.{}'.format(cache_dir, cache_ext)):
+            if(old_cache_path != cache_path):
+                try:
+                    os.remove(old_cache_path)
+                except OSError:
+                    logger.exception('Failed to remove stale daily settlement values (%s).', old_cache_path)
+
+    logger.debug('type(monthly_vx_eod_values) = %s', type(monthly_vx_eod_values))
+    logger.debug('monthly_vx_eod_values =\n%s', monthly_vx_eod_values)
 
     # Add datetime-formatted column of expiration dates.
     try:
         monthly_vx_eod_values['Expiration Date'] = pd.to_datetime(
                     monthly_vx_eod_values['Expiration Date'], format='%Y-%m-%d')
-        front_month_eod_value = monthly_vx_eod_values.iloc[0]
-        back_month_eod_value  = monthly_vx_eod_values.iloc[1]
-    except:
+    except (KeyError, ValueError):
         logger.exception('Failed to read monthly contract expiration dates.')
         raise
 
     # Filter out expired contracts.
     monthly_vx_eod_values = monthly_vx_eod_values[monthly_vx_eod_values['Expiration Date'] > last_posted_date]
 
-    logger.debug('monthly_vx_eod_values =\n{}'.format(monthly_vx_eod_values))
-
-    front_month_expdate = front_month_eod_value['Expiration Date']
-    back_month_expdate  = back_month_eod_value['Expiration Date']
-    front_month_price   = front_month_eod_value['Price']
-    back_month_price    = back_month_eod_value['Price']
-
-    logger.debug('front_month_expdate = {}'.format(front_month_expdate))
-    logger.debug('back_month_expdate  = {}'.format(back_month_expdate ))
-    logger.debug('front_month_price   = {}'.format(front_month_price  ))
-    logger.debug('back_month_price    = {}'.format(back_month_price   ))
+    logger.debug('monthly_vx_eod_values =\n%s', monthly_vx_eod_values)
     return(monthly_vx_eod_values)
 #END: fetch_vx_daily_settlement
 
-def is_cboe_cache_current(contract, expdate, cache_path):
+def is_vx_settlement_line(line):
     """
-    Test whether or not the contract's cache is up-to-date.
+    Test if a raw line of CBOE's daily settlement CSV belongs to VX futures
+    (Product column is 'VX', quoted or not).
 
     Parameters
     ----------
-    contract : pd.DataFrame
-        Contract dataframe.
+    line : bytes
+        Line of CSV.
+
+    Returns
+    -------
+    bool
+    """
+    return(line.startswith((b'VX,', b'"VX",')))
+#END: is_vx_settlement_line
+
+def is_cboe_cache_current(expdate, cache_path):
+    """
+    Test whether or not the contract's cache is up-to-date. Only the cache file's
+    modification time is inspected, so the cache need not be loaded beforehand.
 
+    Parameters
+    ----------
     expdate : datetime
         Contract's expiration date.
 
@@ -509,18 +656,19 @@ def is_cboe_cache_current(contract, expdate, cache_path):
         Contract's cache is up-to-date.
     """
     try:
-        (mode, ino, dev, nlink, uid, gid, size, atime, mtime, ctime) = os.stat(cache_path)
-    except:
+        mtime = os.stat(cache_path).st_mtime
+    except OSError:
         # Contract is not cached; therefore, cache is not up-to-date.
         return False
-    # Cache is stale if the contract has not expired.
-    last_modified_datetime = pd.to_datetime(mtime, unit='s', utc=True).astimezone('America/Chicago').replace(tzinfo=None)
-    if(last_modified_datetime < expdate):
-        logger.debug('expdate = {}'.format(expdate))
-        logger.debug('last_posted_datetime = {}'.format(last_posted_date))
-        logger.debug('cboe_historical_update_datetime = {}'.format(cboe_historical_update_datetime))
-        logger.debug('last_modified_datetime = {}'.format(last_modified_datetime))
-        logger.debug('Cache ({}) is out-of-date.'.format(cache_path))
+    # Cache is stale if the contract has not expired. Compare as POSIX timestamps to
+    # avoid building timezone-aware datetimes for every up-to-date cache.
+    if(mtime < pd.Timestamp(expdate).tz_localize('America/Chicago').timestamp()):
+        last_modified_datetime = pd.to_datetime(mtime, unit='s', utc=True).astimezone('America/Chicago').replace(tzinfo=None)
+        logger.debug('expdate = %s', expdate)
+        logger.debug('last_posted_datetime = %s', last_posted_date)
+        logger.debug('cboe_historical_update_datetime = %s', cboe_historical_update_datetime)
+        logger.debug('last_modified_datetime = %s', last_modified_datetime)
+        logger.debug('Cache (%s) is out-of-date.', cache_path)
         return False
     return True
 #END: is_cboe_cache_current
@@ -540,6 +688,29 @@ def get_vx_expiration_date(monthyear):
     datetime
         Contract's expiration date.
     """
+    return(vx_expiration_date(monthyear.year, monthyear.month))
+#END: get_vx_expiration_date
+
+@functools.lru_cache(maxsize=None)
+def vx_expiration_date(year, month):
+    """
+    Return the expiration date of the VX contract expiring in the given month. Results
+    are memoized since they depend only on the year and month.
+
+    Parameters
+    ----------
+    year : int
+        Contract's year of expiration.
+
+    month : int
+        Contract's month of expiration.
+
+    Returns
+    -------
+    datetime
+        Contract's expiration date.
+    """
+    monthyear     = pd.Timestamp(year, month, 1)
     contract_name = '({}){:%m/%Y}'.format(month_code[monthyear.month], monthyear)
 
     # Compute the expiration date using rules from CBOE:
@@ -552,36 +723,43 @@ def get_vx_expiration_date(monthyear):
     mp1                     = monthyear + MonthEnd()
     third_friday_of_mp1     = mp1 + 3*Week(weekday=4)
     expdate                 = third_friday_of_mp1 - 30*Day()
-    if(not(is_business_day(third_friday_of_mp1) and is_business_day(expdate))):
-        expdate = expdate - bday_us
-    logger.debug('Contract {} expires on {:%Y-%m-%d}.'.format(contract_name, expdate))
+    dates                   = np.array([third_friday_of_mp1.to_datetime64(), expdate.to_datetime64()]).astype('datetime64[D]')
+    if(not np.is_busday(dates, holidays=holidays_us).all()):
+        # Roll forward first so that a holiday Wednesday steps back to the business day preceding it.
+        expdate = pd.Timestamp(np.busday_offset(dates[1], -1, roll='forward', holidays=holidays_us))
+    expdate = expdate.as_unit('ns') # Both branches yield the same resolution, so columns and caches do not mix units.
+    logger.debug('Contract %s expires on %s.', contract_name, expdate.date())
     return expdate
-#END: get_vx_expiration_date
+#END: vx_expiration_date
 
 def count_business_days(start, end):
     """
-    Count the number of business days between two dates.
+    Count the number of business days between pairs of dates.
 
     Parameters
     ----------
-    start : datetime
-        First date.
+    start : array-like of datetime
+        First dates.
 
-    end : datetime
-        Second date.
+    end : array-like of datetime
+        Second dates.
 
     Returns
     -------
-    int
-        Number of business days from start (inclusive) to end (exclusive).
+    np.ndarray of float
+        Number of business days from start (inclusive) to end (exclusive), or NaN
+        where either date is missing.
     """
+    start         = np.asarray(start, dtype='datetime64[ns]')
+    end           = np.asarray(end, dtype='datetime64[ns]')
     mask          = pd.notnull(start) & pd.notnull(end)
-    start         = start.values.astype('datetime64[D]')[mask]
-    end           = end.values.astype('datetime64[D]')[mask]
-    holidays      = calendar_us.holidays().values.astype('datetime64[D]')
-    result        = np.empty(len(mask), dtype= float)
-    result[mask]  = np.busday_count(start, end, holidays=holidays)
-    result[~mask] = np.nan
+    start         = start.astype('datetime64[D]')
+    end           = end.astype('datetime64[D]')
+    if(mask.all()):
+        # No missing dates; count in a single pass.
+        return(np.busday_count(start, end, holidays=holidays_us).astype(float))
+    result        = np.full(len(mask), np.nan)
+    result[mask]  = np.busday_count(start[mask], end[mask], holidays=holidays_us)
     return(result)
 #END: count_business_days
 
@@ -676,48 +854,43 @@ def build_continuous_vx_dataframe(vx_contract_df):
     [62 rows x 3 columns]
 
     """
+    # Sort contracts by trading day and then by expiration date so that each trading
+    # day's contracts are ordered from the front-month onward.
+    vx_contract_df = vx_contract_df.iloc[np.lexsort((vx_contract_df['Expiration Date'].values, vx_contract_df.index.values))]
     timeframe      = vx_contract_df.index.unique()
+    vx_position    = vx_contract_df.groupby(level=0).cumcount().values # contract's position within its trading day
+    logger.debug('vx_position =\n%s', vx_position)
 
-    # Create GroupBy objects.
-    vx_td_gb = vx_contract_df.groupby(vx_contract_df.index) # group by trading day
-    vx_ed_gb = vx_contract_df.groupby('Expiration Date') # group by expiration day
-    logger.debug('vx_td_gb =\n{}'.format(vx_td_gb))
-
-    # Get list (series) of expiration dates
-    vx_expdate_s    = pd.Series(vx_ed_gb.first().index) # build from given contract dataframe
-    if(timeframe[0] < vx_expdate_s[0]):
+    # Get sorted array of expiration dates
+    vx_expdates     = np.unique(vx_contract_df['Expiration Date'].values) # build from given contract dataframe
+    if(timeframe[0] < vx_expdates[0]):
         # Prepend list of expiration dates with prior expiration date within the given timeframe.
-        prior_monthyear = vx_expdate_s[0] - MonthEnd() - MonthBegin()
-        prior_expdate_s = pd.Series(get_vx_expiration_date(prior_monthyear))
-        vx_expdate_s    = pd.concat([prior_expdate_s, vx_expdate_s])
+        prior_monthyear = pd.Timestamp(vx_expdates[0]) - MonthEnd() - MonthBegin()
+        prior_expdate   = get_vx_expiration_date(prior_monthyear).to_datetime64()
+        vx_expdates     = np.concatenate(([prior_expdate], vx_expdates))
 
     # Create continuous prior-month (m0) expiration date series, indexed by trading day.
-    vx_pm_s = pd.Series(
-            [
-                vx_expdate_s[ vx_expdate_s <= d ].iloc[-1]
-                if(len(vx_expdate_s[ vx_expdate_s <= d ]) > 0)
-                else None
-                for d in timeframe
-                ],
-            index=timeframe
-            )
-    vx_pm_s = vx_pm_s.dropna() # exclude entries without a prior-month contract
-
-    logger.debug('vx_expdate_s =\n{}'.format(vx_expdate_s))
+    # Expiration dates are sorted, so the prior-month expiration of each trading day is
+    # found with a single binary search per day.
+    vx_pm_i = np.searchsorted(vx_expdates, timeframe.values, side='right') - 1
+    vx_pm_s = pd.Series(vx_expdates[vx_pm_i], index=timeframe)
+    vx_pm_s = vx_pm_s[vx_pm_i >= 0] # exclude entries without a prior-month contract
+
+    logger.debug('vx_expdates =\n%s', vx_expdates)
 
     # Create continuous VX futures dataframes.
-    vx_m1_df = vx_td_gb.nth(0) # front-month
-    vx_m2_df = vx_td_gb.nth(1) # back-month
-    vx_m4_df = vx_td_gb.nth(3) # m4
-    vx_m5_df = vx_td_gb.nth(4) # m5
-    vx_m6_df = vx_td_gb.nth(5) # m6
-    vx_m7_df = vx_td_gb.nth(6) # m7
+    vx_m1_df = vx_contract_df[vx_position == 0] # front-month
+    vx_m2_df = vx_contract_df[vx_position == 1] # back-month
+    vx_m4_df = vx_contract_df[vx_position == 3] # m4
+    vx_m5_df = vx_contract_df[vx_position == 4] # m5
+    vx_m6_df = vx_contract_df[vx_position == 5] # m6
+    vx_m7_df = vx_contract_df[vx_position == 6] # m7
 
-    logger.debug('vx_fm_df =\n{}'.format(vx_m1_df))
+    logger.debug('vx_fm_df =\n%s', vx_m1_df)
 
     # Create custom dataframes indexed by trading day.
     vx_continuous_df = pd.DataFrame(index=vx_pm_s.index)
-    logger.debug('vx_pm_s.index =\n{}'.format(vx_pm_s.index))
+    logger.debug('vx_pm_s.index =\n%s', vx_pm_s.index)
 
     # Calculate short-term columns.
     vx_continuous_df['Month0 Expiration Date'] = vx_pm_s
@@ -728,25 +901,37 @@ def build_continuous_vx_dataframe(vx_contract_df):
     vx_continuous_df['Month5 Settle']          = vx_m5_df['Settle']
     vx_continuous_df['Month6 Settle']          = vx_m6_df['Settle']
     vx_continuous_df['Month7 Settle']          = vx_m7_df['Settle']
-    vx_continuous_df['Roll Period']            = count_business_days(
-            vx_continuous_df['Month0 Expiration Date'], vx_continuous_df['Month1 Expiration Date'])
-    vx_continuous_df['Days Till Rollover']     = (count_business_days(
-            vx_continuous_df.index, vx_continuous_df['Month1 Expiration Date']) - 1)
-    vx_continuous_df['ST Month1 Weight']       = vx_continuous_df['Days Till Rollover'] / vx_continuous_df['Roll Period']
-    vx_continuous_df['ST Month2 Weight']       = 1.0 - vx_continuous_df['ST Month1 Weight']
-    vx_continuous_df['MT Month4 Weight']       = (vx_continuous_df['Days Till Rollover'] / vx_continuous_df['Roll Period']) / 3.0
-    vx_continuous_df['MT Month7 Weight']       = (1.0 / 3.0) - vx_continuous_df['MT Month4 Weight']
+    # Count business days for the roll period and days till rollover in a single call.
+    num_days                                   = len(vx_continuous_df)
+    m1_expdates                                = vx_continuous_df['Month1 Expiration Date'].values
+    business_days                              = count_business_days(
+            np.concatenate([vx_continuous_df['Month0 Expiration Date'].values, vx_continuous_df.index.values]),
+            np.concatenate([m1_expdates, m1_expdates]))
+    roll_period                                = business_days[:num_days]
+    days_till_rollover                         = business_days[num_days:] - 1
+    vx_continuous_df['Roll Period']            = roll_period
+    vx_continuous_df['Days Till Rollover']     = days_till_rollover
+
+    # Calculate weights and constant-maturity values on the underlying arrays.
+    st_m1_weight = days_till_rollover / roll_period
+    st_m2_weight = 1.0 - st_m1_weight
+    mt_m4_weight = st_m1_weight / 3.0
+    mt_m7_weight = (1.0 / 3.0) - mt_m4_weight
+    vx_continuous_df['ST Month1 Weight']       = st_m1_weight
+    vx_continuous_df['ST Month2 Weight']       = st_m2_weight
+    vx_continuous_df['MT Month4 Weight']       = mt_m4_weight
+    vx_continuous_df['MT Month7 Weight']       = mt_m7_weight
     vx_continuous_df['STCMVF']                 =\
-        vx_continuous_df['ST Month1 Weight'] * vx_continuous_df['Month1 Settle'] +\
-        vx_continuous_df['ST Month2 Weight'] * vx_continuous_df['Month2 Settle']
+        st_m1_weight * vx_continuous_df['Month1 Settle'].values +\
+        st_m2_weight * vx_continuous_df['Month2 Settle'].values
     vx_continuous_df['MTCMVF']                 =\
-        vx_continuous_df['MT Month4 Weight'] * vx_continuous_df['Month4 Settle'] +\
-        (1.0 / 3.0) * vx_continuous_df['Month5 Settle'] +\
-        (1.0 / 3.0) * vx_continuous_df['Month6 Settle'] +\
-        vx_continuous_df['MT Month7 Weight'] * vx_continuous_df['Month7 Settle']
+        mt_m4_weight * vx_continuous_df['Month4 Settle'].values +\
+        (1.0 / 3.0) * (vx_continuous_df['Month5 Settle'].values + vx_continuous_df['Month6 Settle'].values) +\
+        mt_m7_weight * vx_continuous_df['Month7 Settle'].values
 
-    logger.debug('vx_continuous_df =\n{}'.format(vx_continuous_df[['Month1 Expiration Date','Roll Period',
-        'Days Till Rollover','ST Month1 Weight']]))
+    if(logger.isEnabledFor(logging.DEBUG)): # Skip slicing the dataframe otherwise.
+        logger.debug('vx_continuous_df =\n%s', vx_continuous_df[['Month1 Expiration Date','Roll Period',
+            'Days Till Rollover','ST Month1 Weight']])
     return(vx_continuous_df)
 #END: build_continuous_vx_dataframe
 
@@ -770,71 +955,70 @@ def fetch_index(index):
     ------
     TimeoutError
     """
-    import urllib.request
-    from bs4 import BeautifulSoup
     url = '{}/{}'.format(cboe_historical_index_base_url, cboe_index[index])
-    logger.debug('Fetching historical data from {}'.format(url))
+    logger.debug('Fetching historical data from %s', url)
     index_df = None
     try_again = True
     retry_attempt = max_retries
     while try_again and retry_attempt > 0:
-        q = multiprocessing.Queue()
-        p = multiprocessing.Process(
-            target=read_csv,
-            args=(q, url),
-            kwargs=dict(
+        try:
+            index_df = read_csv(
+                url,
                 skiprows=1,
                 header=1,
                 names=['Date', 'Open', 'High', 'Low', 'Close']
-                ),
-            )
-        p.start()
-        try:
-            index_df = q.get(True, timeout_sec + delay_sec)
+                )
             try_again = False
-        except queue.Empty: # timed out
-            p.terminate()
-            p.join()
-            logger.debug('Timed out. Retrying...')
-        except:
-            logger.exception('Failed to download {} data.'.format(index))
+        except (requests.Timeout, requests.ConnectionError): # timed out or connection dropped (transient)
+            logger.debug('Timed out or lost connection. Retrying...', exc_info=True)
+        except (requests.RequestException, ValueError): # HTTP error or unparsable CSV (pd.errors.ParserError).
+            logger.exception('Failed to download %s data.', index)
             raise
-        p.join()
         retry_attempt -= 1
     if try_again:
         raise TimeoutError('Failed to retrieve index {} from {}.'.format(index, url))
         return None
-    logger.debug('index_df = \n{}'.format(index_df))
+    logger.debug('index_df = \n%s', index_df)
     stoday = '{:%m/%d/%Y}'.format(today)
     if(stoday not in index_df['Date'].values):
         # Fetch today's data from Yahoo! Finance
         url = 'https://finance.yahoo.com/quote/%5E{}'.format(index)
-        logger.debug('Fetching {} quote from {}'.format(index, url))
-        req = urllib.request.Request(
+        logger.debug('Fetching %s quote from %s', index, url)
+        quote_page = session.get(
             url,
-            data=None,
             headers={
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36',
             },
+            timeout=timeout_sec,
         )
-        quote_page = urllib.request.urlopen(req)
-        quote_soup = BeautifulSoup(quote_page, 'html5lib')
-        close_text = quote_soup.select('fin-streamer[data-symbol="^{}"]'.format(index))[0].text
-        logger.debug('close_text = {}'.format(close_text))
-        close = float(close_text)
+        quote_page.raise_for_status()
+        # Scan the raw page for the quote rather than building a DOM for one number.
+        m = p_yahoo_quote[index].search(quote_page.content)
+        if(m is not None):
+            close_text = m.group(1).decode('ascii')
+        else: # Markup changed; fall back to a full parse.
+            logger.debug('Quote pattern not found; parsing page with BeautifulSoup')
+            from bs4 import BeautifulSoup, FeatureNotFound
+            try:
+                quote_soup = BeautifulSoup(quote_page.content, 'lxml') # Fast C parser.
+            except FeatureNotFound:
+                quote_soup = BeautifulSoup(quote_page.content, 'html5lib') # lxml is not installed.
+            close_text = quote_soup.select('fin-streamer[data-symbol="^{}"][data-field="regularMarketPrice"]'.format(index))[0].text
+        logger.debug('close_text = %s', close_text)
+        close = float(close_text.replace(',', '')) # e.g., 1,234.50
         last_entry = pd.DataFrame([
             dict(
                 Date=stoday, Open=np.nan, High=np.nan, Low=np.nan,
                 Close=close
                 )
             ])
-        index_df = pd.concat([index_df, last_entry])
-        logger.debug('Appending to dataframe:\n{}'.format(last_entry))
-    # Parse dates (assuming MM/DD/YYYY format), set timezone to UTC, and reset to midnight.
+        index_df = pd.concat([index_df, last_entry], ignore_index=True)
+        logger.debug('Appending to dataframe:\n%s', last_entry)
+    # Parse dates (assuming MM/DD/YYYY format) and index by date.
     index_df['Date'] = pd.to_datetime(index_df['Date'],
             format='%m/%d/%Y')
-    index_df = index_df.set_index(index_df['Date'], drop=True)
-    logger.debug('Fetched {} data:\n{}'.format(index, index_df))
+    index_df = index_df.set_index('Date', drop=True)
+    logger.debug('Fetched %s data:\n%s', index, index_df)
     return(index_df)
 #END: fetch_index
 
@@ -851,39 +1035,34 @@ def build_vx_continuous_df_cache(cache_dir='.data'):
     #import ipdb;ipdb.set_trace()
 
     end_date      = last_settled_date
-    start_date    = pd.datetime(2006, 1, 1)
+    start_date    = datetime.datetime(2006, 1, 1)
     target_period = pd.date_range(start=start_date, end=end_date, freq=bday_us)
-    logger.debug('target_period =\n{}'.format(target_period))
+    logger.debug('target_period =\n%s', target_period)
 
     # Load VX contracts.
     vx_contract_df = fetch_vx_contracts(target_period, force_update=True)
-    logger.debug('vx_contract_df =\n{}'.format(vx_contract_df))
+    logger.debug('vx_contract_df =\n%s', vx_contract_df)
 
     # Build dataframe of continuous VX data.
     vx_continuous_df = build_continuous_vx_dataframe(vx_contract_df)
-    logger.debug('vx_continuous_df =\n{}'.format(vx_continuous_df))
+    logger.debug('vx_continuous_df =\n%s', vx_continuous_df)
 
-    # Add 'VIX' column to continuous dataframe.
-    try:
-        vix_df = fetch_index('VIX')
-    except:
-        logger.exception('Failed to fetch index VIX.')
-    vx_continuous_df['VIX'] = vix_df['Close']
-
-    # Add 'VIX6M' column to continuous dataframe.
-    try:
-        vxmt_df = fetch_index('VIX6M')
-    except:
-        logger.exception('Failed to fetch index VIX6M.')
-    vx_continuous_df['VIX6M'] = vxmt_df['Close']
+    # Add 'VIX' and 'VIX6M' columns to continuous dataframe.
+    for index in ('VIX', 'VIX6M'):
+        try:
+            index_df = fetch_index(index)
+        except (requests.RequestException, TimeoutError, ValueError, IndexError, KeyError): # Download or scrape failed.
+            logger.exception('Failed to fetch index %s.', index)
+            continue
+        vx_continuous_df[index] = index_df['Close']
 
     # Cache dataframe.
-    cache_path = '{}/vx_continuous_df.p'.format(cache_dir)
+    cache_path = '{}/{}'.format(cache_dir, vx_continuous_df_cache_file)
     try:
         # Cache continuous futures dataframe.
-        pickle.dump(vx_continuous_df, open(cache_path, 'wb'))
-        logger.debug('Cached VIX futures continuous dataframe in ({}).'.format(cache_path))
-    except:
+        write_cache(vx_continuous_df, cache_path)
+        logger.debug('Cached VIX futures continuous dataframe in (%s).', cache_path)
+    except cache_write_errors:
         logger.exception('Failed to cache VIX futures continuous dataframe.')
 #END: build_vx_continuous_df_cache
 
@@ -892,6 +1071,8 @@ def test_plot():
     import matplotlib
     matplotlib.use('Agg')
     import matplotlib.pyplot as plt
+    from pandas import ExcelWriter, plotting
+    plotting.register_matplotlib_converters()
     import code
 
     # Debug-level logging.
@@ -906,10 +1087,10 @@ def test_plot():
 
     # Setup timeframe to cover from 1/1/2006 to the most recent business day.
     end_date      = (now - bday_us*(not is_business_day(today))).normalize()
-    start_date    = pd.datetime(2006, 1, 1)
+    start_date    = datetime.datetime(2006, 1, 1)
     target_period = pd.date_range(start=start_date, end=end_date, freq=bday_us)
 
-    logger.debug('target_period =\n{}'.format(target_period))
+    logger.debug('target_period =\n%s', target_period)
 
     # Load VX contracts.
     vx_contract_df = fetch_vx_contracts(target_period)
@@ -932,7 +1113,7 @@ def test_plot():
     # Write to Excel
     writer = ExcelWriter('vf_test.xlsx')
     vx_continuous_df.to_excel(writer)
-    writer.save()
+    writer.close()
 
     # Drop into a Python shell with all definitions.
     code.interact(local=dict(globals(), **locals()))
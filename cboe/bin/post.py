@@ -3,36 +3,58 @@
 """Calculate, chart, and post STCMVF and MTCMVF to StockTwits."""
 
 import settings
+import datetime
+import pytz
+import sys
+
+# Weekends need no calendar, so quit before the heavy imports below (holidays are
+# checked in main).
+if(__name__ == '__main__' and settings.check_for_holiday and
+        datetime.datetime.now(pytz.timezone('America/Chicago')).weekday() >= 5):
+    sys.exit()
+
 import cboe
+import concurrent.futures
 import pandas as pd
-from pandas import ExcelWriter
-from pandas import plotting
-plotting.register_matplotlib_converters()
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib import gridspec
 import numpy as np
 import requests
-import ssl
 import mimetypes
-import pickle
-import sys
+import io
+import math
 import time
-import pytz
 import logging
 import logging.config
 
-# Log setup
-logging.config.fileConfig('logging.conf')
+# Log setup (configured from logging.conf when run as a script)
 logger = logging.getLogger('post')
 
-def main():
+chart_dpi  = 120 # StockTwits downscales attached charts; higher DPI only costs render time.
+plt        = None # matplotlib.pyplot, loaded on first use (see load_pyplot).
+
+# StockTwits
+stocktwits_create_message_url = 'https://api.stocktwits.com/api/2/messages/create.json'
+stocktwits_max_message_length = 1000 # characters
+stocktwits_attachment_length  = 24   # characters an attachment counts toward the limit
+max_post_attempts             = 3
+max_backoff_sec               = 30
+session                       = requests.Session() # Keep-alive connection to StockTwits, shared across posts.
+session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+# Layout of the continuous sheet in the Excel export.
+excel_column_width   = 25
+excel_column_formats = ( # (columns, number format)
+    (('C', 'E', 'F', 'G', 'H', 'I', 'P', 'Q'), '0.000'),
+    (('J', 'K'), '0'),
+    (('L', 'M', 'N', 'O'), '0.0%'),
+    (('R', 'S'), '0.00'),
+    )
+
+def main(cache_dir='.data'):
     # Is today a business day? If not, quit.
     if(settings.check_for_holiday and not cboe.is_business_day(cboe.today)):
-        logger.debug('Today ({:%Y-%m-%d}) is a non-workday. Aborting...'.format(cboe.today))
+        logger.debug('Today (%s) is a non-workday. Aborting...', cboe.today.date())
         sys.exit()
-    logger.debug('Today ({:%Y-%m-%d}) is a workday. Proceeding...'.format(cboe.today))
+    logger.debug('Today (%s) is a workday. Proceeding...', cboe.today.date())
 
     # Setup timeframe to cover last several years from the most recent business day.
     years         = max(settings.st_years, settings.mt_years)
@@ -40,82 +62,148 @@ def main():
     start_date    = end_date - years*365*cboe.Day()
     target_period = pd.date_range(start=start_date, end=end_date, freq=cboe.bday_us)
 
-    logger.debug('target_period =\n{}'.format(target_period))
+    logger.debug('target_period =\n%s', target_period)
+
+    # Reuse cached continuous data (see write_vx_continuous_df_to_excel) if it covers the
+    # timeframe, and only rebuild from its last date onward. That date is rebuilt too in
+    # case it was cached from CBOE's preliminary daily settlement.
+    cache_vx_continuous_df = None
+    build_period           = target_period
+    try:
+        cache_vx_continuous_df = cboe.read_cache('{}/{}'.format(cache_dir, cboe.vx_continuous_df_cache_file))
+        if(cache_vx_continuous_df.index[0] <= target_period[0]):
+            build_period           = target_period[target_period >= min(cache_vx_continuous_df.index[-1], target_period[-1])]
+            cache_vx_continuous_df = cache_vx_continuous_df[
+                    (cache_vx_continuous_df.index >= target_period[0]) &
+                    (cache_vx_continuous_df.index < build_period[0])
+                    ]
+            logger.debug('Rebuilding continuous data from %s.', build_period[0].date())
+        else:
+            cache_vx_continuous_df = None
+    except cboe.cache_read_errors + (IndexError,): # Includes an empty cache.
+        logger.debug('No usable continuous-data cache; rebuilding entire timeframe.')
+        cache_vx_continuous_df = None
+
+    # Fetch VIX in the background while the VX contracts load; both mostly wait on the network.
+    executor   = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    vix_future = executor.submit(cboe.fetch_index, 'VIX')
+    executor.shutdown(wait=False) # Lets the submitted fetch run to completion.
 
     # Load VX contracts.
-    vx_contract_df = cboe.fetch_vx_contracts(target_period)
-    logger.debug('vx_contract_df =\n{}'.format(vx_contract_df))
+    vx_contract_df = cboe.fetch_vx_contracts(build_period)
+    logger.debug('vx_contract_df =\n%s', vx_contract_df)
 
     # Build dataframe of continuous VX data.
     vx_continuous_df = cboe.build_continuous_vx_dataframe(vx_contract_df)
-    logger.debug('vx_continuous_df =\n{}'.format(vx_continuous_df))
+    if(cache_vx_continuous_df is not None):
+        vx_continuous_df = pd.concat([cache_vx_continuous_df, vx_continuous_df])
+    logger.debug('vx_continuous_df =\n%s', vx_continuous_df)
 
     # Add 'VIX' column to continuous dataframe.
     try:
-        vix_df = cboe.fetch_index('VIX')
+        vix_df = vix_future.result()
         success = True
-    except:
+    except (requests.RequestException, TimeoutError, ValueError, IndexError, KeyError): # Download or scrape failed.
+        logger.exception('Failed to fetch index VIX; will not post.')
         success = False
-    st_post_st_chart = settings.st_post_st_chart and success
-    st_post_mt_chart = settings.st_post_mt_chart and success
+    st_post_st_chart = settings.st_post_st_chart
+    st_post_mt_chart = settings.st_post_mt_chart
     if(success):
         vx_continuous_df['VIX'] = vix_df['Close']
 
-    if(st_post_st_chart):
-        # Plot short-term VX data to image file.
-        generate_vx_figure(vx_continuous_df, settings.st_years, 'VIX', 'STCMVF', 'VIX', 'Short-Term Constant-Maturity VIX Futures (STCMVF)', settings.st_histogram_xstep)
-        plt.savefig(settings.st_st_chart_file, dpi=300)
-    if(st_post_mt_chart):
-        # Plot mid-term VX data to image file.
-        generate_vx_figure(vx_continuous_df, settings.mt_years, 'VIX', 'MTCMVF', 'VIX', 'Mid-Term Constant-Maturity VIX Futures (MTCMVF)', settings.mt_histogram_xstep)
-        plt.savefig(settings.st_mt_chart_file, dpi=300)
-
     # Dump continuous futures dataframe to Excel.
     write_vx_continuous_df_to_excel(vx_continuous_df, dry_run=(not settings.export_excel))
 
     # Update Excel file on Google Drive.
     update_vx_continuous_df_googledrive(dry_run=(not settings.export_excel))
 
-    # Get recent VX quotes.
-    vx_yesterday     = vx_continuous_df.iloc[-2]
-    vx_today         = vx_continuous_df.iloc[-1]
-    stcmvf_yesterday = vx_yesterday['STCMVF']
-    stcmvf_today     = vx_today['STCMVF']
+    # Messages and charts need today's VIX. A VIX column carried over from the cache
+    # ends before today, so do not fall back to it.
+    if(not success):
+        return
+
+    # Get recent VX quotes (last two rows as float64 scalars).
+    quote_columns = ['STCMVF', 'MTCMVF', 'VIX', 'Month1 Settle', 'ST Month1 Weight', 'Month4 Settle', 'MT Month4 Weight']
+    vx_quotes     = vx_continuous_df[quote_columns].iloc[-2:]
+    logger.debug('vx_quotes =\n%s', vx_quotes)
+    ((stcmvf_yesterday, mtcmvf_yesterday, _, _, _, _, _),
+     (stcmvf_today, mtcmvf_today, vix, m1_vx, m1_weight, m4_vx, m4_weight)) = vx_quotes.to_numpy(dtype=np.float64)
     stcmvf_percent   = (stcmvf_today / stcmvf_yesterday) - 1.0
-    vix              = vx_today['VIX']
     stcmvf_premium   = (stcmvf_today / vix) - 1.0
-    m1_vx            = vx_today['Month1 Settle']
-    m1_weight        = vx_today['ST Month1 Weight']
     stcmvf_rate      = (stcmvf_premium / 30.0) if m1_weight >= 1.0 else ((stcmvf_today / m1_vx) - 1.0) / (30.0 * (1.0 - m1_weight))
     stcmvf_verb      = 'charging' if stcmvf_rate > 0.0 else 'paying'
-    mtcmvf_yesterday = vx_yesterday['MTCMVF']
-    mtcmvf_today     = vx_today['MTCMVF']
     mtcmvf_percent   = (mtcmvf_today / mtcmvf_yesterday) - 1.0
-    m4_vx            = vx_today['Month4 Settle']
-    m4_weight        = vx_today['MT Month4 Weight']
     mtcmvf_premium   = (mtcmvf_today / vix) - 1.0
     mtcmvf_rate      = ((mtcmvf_today / m4_vx) - 1.0) / (30.0 * (2.0 - m4_weight * 3.0))
     mtcmvf_verb      = 'charging' if mtcmvf_rate > 0.0 else 'paying'
-    logger.debug('vx_yesterday =\n{}'.format(vx_yesterday))
-    logger.debug('vx_today =\n{}'.format(vx_today))
 
-    # Post to StockTwits.
+    # Compose StockTwits messages.
+    st_combine = getattr(settings, 'st_combine', False) # Absent from settings files predating this option.
     st_st_message = settings.st_st_message.format(stcmvf_today, stcmvf_percent, stcmvf_premium, vix, stcmvf_verb, abs(stcmvf_rate))
     st_mt_message = settings.st_mt_message.format(mtcmvf_today, mtcmvf_percent, mtcmvf_premium, vix, mtcmvf_verb, abs(mtcmvf_rate))
-    logger.debug('st_st_message = {}'.format(st_st_message))
-    logger.debug('st_mt_message = {}'.format(st_mt_message))
-
-    if(st_post_st_chart):
-        st_st_attachment = settings.st_st_chart_file
-        logger.debug('Posting message with {}.'.format(settings.st_st_chart_file))
+    logger.debug('st_st_message = %s', st_st_message)
+    logger.debug('st_mt_message = %s', st_mt_message)
+    if(st_combine):
+        st_combined_message = settings.st_combined_message.format(
+                stcmvf_today, stcmvf_percent, stcmvf_premium, vix, stcmvf_verb, abs(stcmvf_rate),
+                mtcmvf_today, mtcmvf_percent, mtcmvf_premium, mtcmvf_verb, abs(mtcmvf_rate)
+                )
+        logger.debug('st_combined_message = %s', st_combined_message)
+
+    # Skip rendering charts that StockTwits would reject for making a message too long.
+    if(st_combine):
+        if((st_post_st_chart or st_post_mt_chart) and
+                len(st_combined_message) + stocktwits_attachment_length > stocktwits_max_message_length):
+            logger.warning('Combined message is too long to attach a chart; posting without one.')
+            st_post_st_chart = st_post_mt_chart = False
     else:
-        st_st_attachment = None
-    if(st_post_mt_chart):
-        st_mt_attachment = settings.st_mt_chart_file
-        logger.debug('Posting message with {}.'.format(settings.st_mt_chart_file))
+        if(st_post_st_chart and len(st_st_message) + stocktwits_attachment_length > stocktwits_max_message_length):
+            logger.warning('STCMVF message is too long to attach a chart; posting without one.')
+            st_post_st_chart = False
+        if(st_post_mt_chart and len(st_mt_message) + stocktwits_attachment_length > stocktwits_max_message_length):
+            logger.warning('MTCMVF message is too long to attach a chart; posting without one.')
+            st_post_mt_chart = False
+
+    st_st_attachment       = None
+    st_mt_attachment       = None
+    st_combined_attachment = None
+    if(st_post_st_chart or st_post_mt_chart):
+        fig = load_pyplot().figure() # Reused (cleared) for each chart.
+    if(st_combine and st_post_st_chart and st_post_mt_chart):
+        # Plot short- and mid-term VX data, stacked, to one image file.
+        (width, height) = fig.get_size_inches()
+        fig.set_size_inches(width, 2*height)
+        (st_fig, mt_fig) = fig.subfigures(2, 1)
+        generate_vx_figure(st_fig, vx_continuous_df, settings.st_years, 'VIX', 'STCMVF', 'VIX', 'Short-Term Constant-Maturity VIX Futures (STCMVF)', settings.st_histogram_xstep)
+        generate_vx_figure(mt_fig, vx_continuous_df, settings.mt_years, 'VIX', 'MTCMVF', 'VIX', 'Mid-Term Constant-Maturity VIX Futures (MTCMVF)', settings.mt_histogram_xstep)
+        st_combined_attachment = save_figure_png(fig, settings.st_combined_chart_file)
+        logger.debug('Posting message with %s.', settings.st_combined_chart_file)
     else:
-        st_mt_attachment = None
+        if(st_post_st_chart):
+            # Plot short-term VX data to image file.
+            fig.clear()
+            generate_vx_figure(fig, vx_continuous_df, settings.st_years, 'VIX', 'STCMVF', 'VIX', 'Short-Term Constant-Maturity VIX Futures (STCMVF)', settings.st_histogram_xstep)
+            st_st_attachment = save_figure_png(fig, settings.st_st_chart_file)
+            logger.debug('Posting message with %s.', settings.st_st_chart_file)
+        if(st_post_mt_chart):
+            # Plot mid-term VX data to image file.
+            fig.clear()
+            generate_vx_figure(fig, vx_continuous_df, settings.mt_years, 'VIX', 'MTCMVF', 'VIX', 'Mid-Term Constant-Maturity VIX Futures (MTCMVF)', settings.mt_histogram_xstep)
+            st_mt_attachment = save_figure_png(fig, settings.st_mt_chart_file)
+            logger.debug('Posting message with %s.', settings.st_mt_chart_file)
+    if(st_post_st_chart or st_post_mt_chart):
+        plt.close(fig) # Release the figure and its artists from pyplot's registry.
 
+    # Post to StockTwits.
+    if(st_combine):
+        # One post covering both STCMVF and MTCMVF, with whichever chart was rendered.
+        post_to_stocktwits(
+            settings.st_access_token,
+            st_combined_message,
+            attachment=(st_combined_attachment or st_st_attachment or st_mt_attachment),
+            dry_run=settings.st_dry_run
+            )
+        return
     post_to_stocktwits(
         settings.st_access_token,
         st_st_message,
@@ -130,13 +218,64 @@ def main():
         )
 #END: main
 
-def generate_vx_figure(vx_continuous_df, years, column_a, column_b, title_a, title_b, histogram_xstep):
+def load_pyplot():
+    """
+    Import and configure matplotlib for off-screen rendering. Deferred so that runs
+    which do not chart skip matplotlib's import cost; subsequent calls are free.
+
+    Returns
+    -------
+    module
+        matplotlib.pyplot
+    """
+    global plt
+    if(plt is None):
+        from pandas import plotting
+        plotting.register_matplotlib_converters()
+        import matplotlib
+        matplotlib.use('Agg')
+        matplotlib.rcParams['path.simplify_threshold'] = 1.0 # Aggressively decimate the dense daily series.
+        import matplotlib.pyplot
+        plt = matplotlib.pyplot
+    return(plt)
+#END: load_pyplot
+
+def save_figure_png(fig, filename):
+    """
+    Render figure to PNG in memory and store a copy to file.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to render.
+
+    filename : str
+        Path of PNG file to write.
+
+    Returns
+    -------
+    tuple
+        (filename, PNG bytes, MIME type), suitable as post_to_stocktwits' attachment.
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=chart_dpi, bbox_inches='tight', pil_kwargs={'optimize': True})
+    png = buf.getvalue()
+    with open(filename, 'wb') as f:
+        f.write(png)
+    return((filename, png, 'image/png'))
+#END: save_figure_png
+
+def generate_vx_figure(fig, vx_continuous_df, years, column_a, column_b, title_a, title_b, histogram_xstep):
     """
     Create the continuous VX figure, which plots column A and column B over time, the
     percent difference between the two, and their histograms.
 
     Parameters
     ----------
+    fig : matplotlib.figure.Figure or matplotlib.figure.SubFigure
+        Empty figure (or sub-figure) to draw on. Callers reusing a figure across
+        charts should clear it first.
+
     vx_continuous_df : pd.DataFrame
         Dataframe generated from cboe.build_continuous_vx_dataframe with an
         added column, 'VIX', that represents VIX's values.
@@ -159,80 +298,90 @@ def generate_vx_figure(vx_continuous_df, years, column_a, column_b, title_a, tit
     histogram_xstep : float
         Volatility histogram's x-axis step value.
     """
-    data_a = vx_continuous_df[cboe.today-years*365*cboe.Day():][column_a].dropna()
-    data_b = vx_continuous_df[cboe.today-years*365*cboe.Day():][column_b].dropna()
-
-    # Setup a grid of sub-plots.
-    fig = plt.figure(1)
-    gs  = gridspec.GridSpec(2, 2, height_ratios=[2, 1], width_ratios=[2, 1])
-    plt.suptitle('{} vs {}'.format(title_a, title_b), style='italic', fontweight='bold', color='#707070')
+    cutoff = cboe.today - pd.Timedelta(days=years*365)
+    sub    = vx_continuous_df.iloc[ # Slice once for both columns, by position (index is sorted by date).
+            vx_continuous_df.index.searchsorted(cutoff):,
+            vx_continuous_df.columns.get_indexer([column_a, column_b])
+            ].dropna() # One NaN sweep: keep only dates on which both series have values.
+    data_a = sub[column_a]
+    data_b = sub[column_b]
+
+    # Setup a grid of sub-plots, with spacing between and around sub-plots.
+    gs  = fig.add_gridspec(2, 2, height_ratios=[2, 1], width_ratios=[2, 1],
+            bottom=0.17, hspace=0.10, wspace=0.35)
+    fig.suptitle('{} vs {}'.format(title_a, title_b), style='italic', fontweight='bold', color='#707070')
 
     # data_a vs data_b
-    timeseries_axes1 = plt.subplot(gs[0, 0])
-    timeseries_axes1.plot(data_a, label=column_a)
-    timeseries_axes1.plot(data_b, label=column_b, alpha=0.75)
-    plt.setp(timeseries_axes1.get_xticklabels(), visible=False) # hide date labels on top subplot
-    plt.grid(True)
-    plt.ylabel('Volatility Level')
-    plt.title('{:0.0f}-Year Daily Chart'.format(years))
+    timeseries_axes1 = fig.add_subplot(gs[0, 0])
+    timeseries_axes1.plot(data_a, label=column_a, rasterized=True)
+    timeseries_axes1.plot(data_b, label=column_b, alpha=0.75, rasterized=True)
+    timeseries_axes1.tick_params(axis='x', labelbottom=False) # hide date labels on top subplot
+    timeseries_axes1.grid(True)
+    timeseries_axes1.set(ylabel='Volatility Level', title='{:0.0f}-Year Daily Chart'.format(years))
     xs, xe = timeseries_axes1.get_xlim()
-    logger.debug('xs, xe = {}, {}'.format(xs, xe))
-    plt.annotate('{:0.3f}'.format(data_b[-1]), xy=(data_b.index[-1], data_b[-1]), xytext=(xe+(xe-xs)*0.03, data_b[-1]),
+    logger.debug('xs, xe = %s, %s', xs, xe)
+    timeseries_axes1.annotate('{:0.3f}'.format(data_b.iloc[-1]), xy=(data_b.index[-1], data_b.iloc[-1]), xytext=(xe+(xe-xs)*0.03, data_b.iloc[-1]),
             verticalalignment='center', arrowprops=dict(arrowstyle='-', color='#ff9f4b'), color='#ff9f4b')
             # show last value
 
     # Percent difference between data_b and data_a
-    pct_diff = ((data_b / data_a) - 1.0) * 100.0
-    timeseries_axes2 = plt.subplot(gs[1, 0], sharex=timeseries_axes1)
-    timeseries_axes2.plot(pct_diff, 'k-')
-    plt.grid(True)
+    # Computed on the raw arrays.
+    pct = np.divide(data_b.values, data_a.values)
+    np.subtract(pct, 1.0, out=pct)
+    np.multiply(pct, 100.0, out=pct)
+    timeseries_axes2 = fig.add_subplot(gs[1, 0], sharex=timeseries_axes1)
+    timeseries_axes2.plot(sub.index, pct, 'k-', rasterized=True)
+    timeseries_axes2.grid(True)
     xs, xe = timeseries_axes2.get_xlim()
-    logger.debug('xs, xe = {}, {}'.format(xs, xe))
+    logger.debug('xs, xe = %s, %s', xs, xe)
     ys, ye = timeseries_axes2.get_ylim()
     ystep  = 10.0
-    logger.debug('ys, ye (before)= {}, {}'.format(ys, ye))
-    ys = np.sign(ys)*np.floor(np.abs(ys)/ystep)*ystep # round-down to nearest ystep
-    ye = np.sign(ye)*np.ceil(np.abs(ye)/ystep)*ystep # round-up to nearest ystep
-    logger.debug('ys, ye (after)= {}, {}'.format(ys, ye))
-    plt.yticks(np.arange(ys, ye, ystep)) # set rounded y-values stepped by ystep
-    plt.ylabel('{}-{} (%)'.format(column_b, column_a))
-    plt.annotate('{:0.1f}%'.format(pct_diff[-1]), xy=(pct_diff.index[-1], pct_diff[-1]), xytext=(xe+(xe-xs)*0.03, pct_diff[-1]),
+    logger.debug('ys, ye (before)= %s, %s', ys, ye)
+    ys = ystep*math.floor(ys/ystep) # round-down to nearest ystep
+    ye = ystep*math.ceil(ye/ystep) # round-up to nearest ystep
+    logger.debug('ys, ye (after)= %s, %s', ys, ye)
+    timeseries_axes2.set(
+            yticks=np.arange(ys, ye, ystep), # set rounded y-values stepped by ystep
+            ylabel='{}-{} (%)'.format(column_b, column_a)
+            )
+    timeseries_axes2.annotate('{:0.1f}%'.format(pct[-1]), xy=(sub.index[-1], pct[-1]), xytext=(xe+(xe-xs)*0.03, pct[-1]),
             verticalalignment='center', arrowprops=dict(arrowstyle='-'))
             # show last percent-difference value
 
     # Histograms
-    hist_axes = plt.subplot(gs[0, 1])
-    hist_axes.hist(data_a, bins='auto', label=column_a)
-    hist_axes.hist(data_b, bins='auto', label=column_b, alpha=0.75)
-    plt.grid(True, axis='x')
-    plt.setp(hist_axes.get_yticklabels(), visible=False) # hide occurence labels on histogram
-    plt.setp(hist_axes.get_yticklines(),  visible=False) # hide occurence axis lines on histogram
+    hist_axes = fig.add_subplot(gs[0, 1])
+    bin_edges = np.histogram_bin_edges(np.concatenate([data_a.values, data_b.values]), bins='auto') # one estimate shared by both series
+    (counts_a, _) = np.histogram(data_a.values, bins=bin_edges)
+    (counts_b, _) = np.histogram(data_b.values, bins=bin_edges)
+    hist_axes.stairs(counts_a, bin_edges, fill=True, label=column_a, rasterized=True) # one artist per series instead of one per bar
+    hist_axes.stairs(counts_b, bin_edges, fill=True, label=column_b, alpha=0.75, rasterized=True)
+    hist_axes.grid(True, axis='x')
+    hist_axes.tick_params(axis='y', left=False, labelleft=False) # hide occurence labels and tick lines on histogram
     xs, xe = hist_axes.get_xlim()
     xstep  = histogram_xstep
-    xclamp_a = np.min(data_a)
-    xclamp_b = np.min(data_b)
-    xclamp   = np.min([xclamp_a, xclamp_b])
-    logger.debug('xs, xe (before)= {}, {}'.format(xs, xe))
-    xs = np.max([xclamp, xs])
-    xs = np.sign(xs)*np.floor(np.abs(xs)/xstep)*xstep # round-down to nearest xstep
-    xe = np.sign(xe)*np.ceil(np.abs(xe)/xstep)*xstep # round-up to nearest xstep
-    logger.debug('xs, xe (after)= {}, {}'.format(xs, xe))
-    plt.xticks(np.arange(xs, xe, xstep)) # set rounded x-values stepped by xstep
-    plt.xlabel('Volatility Level')
-    plt.title('Histogram')
-    plt.legend(bbox_to_anchor=(0.5, -0.25), loc='upper center', ncol=1) # place legend below histogram
+    xclamp = min(data_a.min(), data_b.min())
+    logger.debug('xs, xe (before)= %s, %s', xs, xe)
+    xs = max(xclamp, xs)
+    xs = xstep*math.floor(xs/xstep) # round-down to nearest xstep
+    xe = xstep*math.ceil(xe/xstep) # round-up to nearest xstep
+    logger.debug('xs, xe (after)= %s, %s', xs, xe)
+    hist_axes.set(
+            xticks=np.arange(xs, xe, xstep), # set rounded x-values stepped by xstep
+            xlabel='Volatility Level',
+            title='Histogram'
+            )
+    hist_axes.legend(bbox_to_anchor=(0.5, -0.25), loc='upper center', ncol=1) # place legend below histogram
 
     # Minor adjustments
-    plt.setp(timeseries_axes2.get_xticklabels(), rotation=60, # rotate dates along x-axis
-            horizontalalignment='right')
-    plt.subplots_adjust(bottom=0.17, hspace=0.10, wspace=0.35) # adjust spacing between and around sub-plots
+    for label in timeseries_axes2.get_xticklabels(): # rotate dates along x-axis
+        label.set(rotation=60, horizontalalignment='right')
 #END: generate_vx_figure
 
 def write_vx_continuous_df_to_excel(vx_continuous_df, filename='vf.xlsx', cache_dir='.data', dry_run=False):
     """
     Dump VIX futures continuous dataframe to an Excel file with formatting. Data is
-    cached (see {cache_dir}/vx_continuous_df.p) and reused on each run, eliminating
-    the need to rebuild old data.
+    cached (see {cache_dir}/cboe.vx_continuous_df_cache_file) and reused on each run,
+    eliminating the need to rebuild old data.
 
     Parameters
     ----------
@@ -251,46 +400,57 @@ def write_vx_continuous_df_to_excel(vx_continuous_df, filename='vf.xlsx', cache_
     if(dry_run):
         logger.debug('Dry-run is enabled so will not update.')
         return
-    logger.debug('vx_continuous_df = \n{}'.format(vx_continuous_df))
-    writer = ExcelWriter(filename, engine='openpyxl')
-    cache_path = '{}/vx_continuous_df.p'.format(cache_dir)
+    logger.debug('vx_continuous_df = \n%s', vx_continuous_df)
+    from pandas import ExcelWriter
+    try:
+        import xlsxwriter # Streams rows to disk and formats whole columns at once.
+        engine = 'xlsxwriter'
+    except ImportError:
+        engine = 'openpyxl'
+    writer = ExcelWriter(filename, engine=engine)
+    cache_path = '{}/{}'.format(cache_dir, cboe.vx_continuous_df_cache_file)
     try:
         # Load continuous futures dataframe from cache.
-        cache_vx_continuous_df = pickle.load(open(cache_path, 'rb'))
-    except:
+        cache_vx_continuous_df = cboe.read_cache(cache_path)
+    except cboe.cache_read_errors:
         cache_vx_continuous_df = vx_continuous_df
     # Update end of cache.
     cache_vx_continuous_df = cache_vx_continuous_df[
             cache_vx_continuous_df.index < vx_continuous_df.index[0]
             ]
     all_vx_continuous_df = pd.concat([cache_vx_continuous_df, vx_continuous_df])
-    logger.debug('all_vx_continuous_df = \n{}'.format(all_vx_continuous_df))
+    logger.debug('all_vx_continuous_df = \n%s', all_vx_continuous_df)
     try:
         # Cache continuous futures dataframe.
-        pickle.dump(all_vx_continuous_df, open(cache_path, 'wb'))
-        logger.debug('Cached VIX futures continuous dataframe in ({}).'.format(cache_path))
-    except:
+        cboe.write_cache(all_vx_continuous_df, cache_path)
+        logger.debug('Cached VIX futures continuous dataframe in (%s).', cache_path)
+    except cboe.cache_write_errors:
         logger.exception('Failed to cache VIX futures continuous dataframe.')
     all_vx_continuous_df.to_excel(writer, sheet_name='Continuous')
     sheet = writer.sheets['Continuous']
-    # Set column widths.
-    for col in ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S'):
-        sheet.column_dimensions[col].width = 25 # index/trade date
-    # Set column formats.
-    for col in ('C', 'E', 'F', 'G', 'H', 'I', 'P', 'Q'):
-        for c in sheet[col]:
-            c.number_format = '0.000'
-    for col in ('J', 'K'):
-        for c in sheet[col]:
-            c.number_format = '0'
-    for col in ('L', 'M', 'N', 'O'):
-        for c in sheet[col]:
-            c.number_format = '0.0%'
-    for col in ('R', 'S'):
-        for c in sheet[col]:
-            c.number_format = '0.00'
-    writer.save()
-    logger.debug('Dumped continuous futures dataframe to ({}).'.format(filename))
+    if(engine == 'xlsxwriter'):
+        # Set column widths and formats, one record per column.
+        sheet.set_column('A:S', excel_column_width)
+        for (cols, number_format) in excel_column_formats:
+            cell_format = writer.book.add_format({'num_format': number_format})
+            for col in cols:
+                sheet.set_column('{0}:{0}'.format(col), excel_column_width, cell_format)
+    else:
+        # Set column widths.
+        for col in ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S'):
+            sheet.column_dimensions[col].width = excel_column_width
+        # Set column formats in a single pass over the data rows.
+        column_formats = {}
+        for (cols, number_format) in excel_column_formats:
+            for col in cols:
+                column_formats[ord(col) - ord('A')] = number_format
+        row_formats = [column_formats.get(i) for i in range(max(column_formats) + 1)]
+        for row in sheet.iter_rows(min_row=2, max_col=len(row_formats)):
+            for (c, number_format) in zip(row, row_formats):
+                if(number_format):
+                    c.number_format = number_format
+    writer.close()
+    logger.debug('Dumped continuous futures dataframe to (%s).', filename)
 #END: write_vx_continuous_df_to_excel
 
 def update_vx_continuous_df_googledrive(filename='vf.xlsx', fileId='0B4HikxB_9ulBMk5KY0YzQ2tzdzA', dry_run=False):
@@ -315,15 +475,12 @@ def update_vx_continuous_df_googledrive(filename='vf.xlsx', fileId='0B4HikxB_9ul
     from googledrive import get_credentials, update_file
     import httplib2
     from apiclient import discovery
-    from googleapiclient.http import MediaFileUpload
-    from oauth2client import client, tools
-    from oauth2client.file import Storage
 
     # Authorize
     credentials = get_credentials('VIX Futures Data', consent=False)
     if(not credentials):
         raise Exception('Failed to retrieve credentials')
-    http_auth = credentials.authorize(httplib2.Http())
+    http_auth = credentials.authorize(httplib2.Http(timeout=30)) # Fail fast rather than hang on a stalled upload.
     drive_service = discovery.build('drive', 'v3', http=http_auth, cache_discovery=False)
 
     # Upload
@@ -335,7 +492,7 @@ def update_vx_continuous_df_googledrive(filename='vf.xlsx', fileId='0B4HikxB_9ul
         )
 #END: update_vx_continuous_df_googledrive
 
-def post_to_stocktwits(access_token, message, link_preamble=' ', link=None, attachment=None, dry_run=False):
+def post_to_stocktwits(access_token, message, link_preamble=' ', link=None, attachment=None, dry_run=False, session=session):
     """
     Post message and attachment (optional) to StockTwits using the given access token
     (see https://stocktwits.com/developers/docs/authentication). Messages must be
@@ -349,59 +506,76 @@ def post_to_stocktwits(access_token, message, link_preamble=' ', link=None, atta
     message : str
         Message to be posted.
 
-    attachment : str
-        Path to image to be attached with message. File formats accepted: JPG, PNG, and
-        GIF under 2MB. Counts as 24 characters if specified.
+    attachment : str or tuple
+        Image to be attached with message: either a file path or an in-memory
+        (filename, bytes, MIME type) tuple (see save_figure_png). File formats
+        accepted: JPG, PNG, and GIF under 2MB. Counts as 24 characters if specified.
 
     dry_run : bool
         Do not actually post message.
 
+    session : requests.Session
+        Session through which to post. Defaults to the module's keep-alive session
+        so that consecutive posts reuse one connection.
+
     Raises
     ------
     TimeoutError
+        All attempts failed with a network error or a server-side response.
+
+    Exception
+        StockTwits rejected the message (4xx response other than 429).
     """
     total_count = len(message)
     payload = {'access_token':access_token, 'body':message}
-    if(attachment):
-        (attachment_type, encoding) = mimetypes.MimeTypes().guess_type(attachment)
-        files = {'chart':(attachment, open(attachment, 'rb'), attachment_type)}
-        total_count += 24
-    else:
-        files = None
-    logger.debug('total_count = ' + str(total_count))
-    logger.debug('payload = ' + str(payload))
-
-    if(total_count > 1000):
-        logger.error('Message length, {}, exceeds 1000 characters.'.format(total_count))
+    if(isinstance(attachment, tuple)):
+        (attachment_name, attachment_body, attachment_type) = attachment
+        total_count += stocktwits_attachment_length
+    elif(attachment):
+        attachment_name = attachment
+        (attachment_type, encoding) = mimetypes.guess_type(attachment) # Module-level database, loaded once.
+        with open(attachment, 'rb') as f:
+            attachment_body = f.read() # Read once; reused on each attempt.
+        total_count += stocktwits_attachment_length
+    logger.debug('total_count = %s', total_count)
+    logger.debug('payload = %s', payload)
+
+    if(total_count > stocktwits_max_message_length):
+        logger.error('Message length, %s, exceeds %s characters.', total_count, stocktwits_max_message_length)
 
     if(dry_run):
         logger.debug('Dry-run is enabled so will not post.')
         return
     posted = False
-    retry_attempt = 3
-    while not posted and retry_attempt > 0:
+    for attempt in range(max_post_attempts):
         try:
             # Post message.
-            r = requests.post('https://api.stocktwits.com/api/2/messages/create.json', data=payload,
-                    files=files)
+            r = session.post(
+                    stocktwits_create_message_url,
+                    data=payload,
+                    files=({'chart':(attachment_name, attachment_body, attachment_type)} if attachment else None)
+                    )
             # Check StockTwit's response.
             r = r.json()
-            logger.debug('Response from StockTwits = ' + str(r))
+            logger.debug('Response from StockTwits = %s', r)
             status = r['response']['status']
-            logger.debug('Status from StockTwits = ' + str(status))
-            if(status != 200):
-                raise Exception('Received invalid response from StockTwits: ' + str(status) + ': ' + str(r))
-            else:
+            logger.debug('Status from StockTwits = %s', status)
+            if(status == 200):
                 posted = True
-        except:
+                break
+            if(400 <= status < 500 and status != 429): # Rejected (e.g., bad token or message); retrying will not help.
+                raise Exception('Received invalid response from StockTwits: ' + str(status) + ': ' + str(r))
+            logger.error('Received invalid response from StockTwits: %s: %s', status, r)
+        except (requests.RequestException, ValueError, KeyError): # Network error or malformed response.
             logger.exception('Failed to post to StockTwits.')
-            time.sleep(1)
-        retry_attempt -= 1
+        if(attempt + 1 < max_post_attempts):
+            time.sleep(min(2**attempt, max_backoff_sec)) # Exponential backoff.
     if not posted:
         raise TimeoutError('Failed to post message: {}'.format(message))
         return
-    logger.info('Posted message: {}'.format(message))
+    logger.info('Posted message: %s', message)
 #END: post_to_stocktwits
 
 if(__name__ == '__main__'):
+    logging.config.fileConfig('logging.conf')
     main()
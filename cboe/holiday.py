@@ -28,4 +28,16 @@ class USMarketHolidayCalendar(AbstractHolidayCalendar):
         USThanksgivingDay,
         Holiday('Christmas', month=12, day=25, observance=nearest_workday)
     ]
+    _holidays_d64 = None
+
+    @classmethod
+    def holidays_d64(cls):
+        """
+        Return the calendar's holidays as an array of datetime64[D], suitable for
+        NumPy's business-day functions (e.g., np.busday_count). The array is
+        computed once and shared by all instances.
+        """
+        if(cls._holidays_d64 is None):
+            cls._holidays_d64 = cls().holidays().values.astype('datetime64[D]')
+        return(cls._holidays_d64)
 #END: USMarketHolidayCalendar
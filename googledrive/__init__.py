@@ -47,7 +47,7 @@ def get_credentials(application, client_secret_file='client_secret.json', scopes
     except FileExistsError:
         pass
     except OSError:
-        logger.exception('Failed to create store directory ({}).'.format(store_dir))
+        logger.exception('Failed to create store directory (%s).', store_dir)
     # Fetch token from store.
     store_file = '{}/vix_futures_poster.json'.format(store_dir)
     store = Storage(store_file)
@@ -58,16 +58,16 @@ def get_credentials(application, client_secret_file='client_secret.json', scopes
             flow = client.flow_from_clientsecrets(client_secret_file, scopes)
             flow.user_agent = application
             credentials = tools.run_flow(flow, store)
-            logger.debug('Stored credentials in ({}).'.format(store_file))
+            logger.debug('Stored credentials in (%s).', store_file)
         else:
             # Warn user that their consent is required.
             logger.error('Consent is required for authorization.')
     else:
-        logger.debug('Fetched credentials from ({}).'.format(store_file))
+        logger.debug('Fetched credentials from (%s).', store_file)
     return(credentials)
 #END: get_credentials
 
-def update_file(drive_service, fileId, mimetype, filename, local_filename=None):
+def update_file(drive_service, fileId, mimetype, filename, local_filename=None, resumable=False):
     """Update Google Drive file's contents.
 
     Parameters
@@ -86,6 +86,10 @@ def update_file(drive_service, fileId, mimetype, filename, local_filename=None):
 
     local_filename : str
         Path of local file being uploaded. Default is name of Google Drive file.
+
+    resumable : bool
+        Upload in resumable chunks. Worth it only for large files; otherwise a
+        single-request upload saves the round trip that opens the upload session.
     """
     if(not local_filename):
         local_filename = filename
@@ -96,7 +100,8 @@ def update_file(drive_service, fileId, mimetype, filename, local_filename=None):
     media = MediaFileUpload(
             local_filename,
             mimetype=mimetype,
-            resumable=True
+            chunksize=-1,
+            resumable=resumable
             )
     gd_file = drive_service.files().update(
             fileId=fileId,
@@ -104,9 +109,8 @@ def update_file(drive_service, fileId, mimetype, filename, local_filename=None):
             media_body=media,
             fields='name, parents'
             ).execute()
-    logger.debug('Uploaded ({}) to Google Drive file ({}; parents={}).'.format(local_filename,
+    logger.debug('Uploaded (%s) to Google Drive file (%s; parents=%s).', local_filename,
         gd_file.get('name'), gd_file.get('parents'))
-        )
 #END: update_file
 
 def test_credentials():
@@ -31,3 +31,11 @@ st_mt_message    = """MTCMVF settled @ {:.3f} ({:+.1%}), {:+.1%} over VIX ({:.3f
 The mid-term constant-maturity VIX futures (MTCMVF) is a weighted average of the current 4th, 5th, 6th, and 7th month VIX futures contracts, and it resets daily. MTCMVF represents the market's 5-month estimate of the S&P 500 30-day volatility index ($VIX), derived from $SPX options. Mid-term VIX ETPs (e.g., $VXZ, VIXM, ZIV, VIIZ, TVIZ) approximately track MTCMVF while compounding daily returns from prior positions."""
 st_post_mt_chart = True
 st_mt_chart_file = 'mt_chart.png'
+
+# Combined STCMVF and MTCMVF post (one message and, when both charts are enabled,
+# one stacked chart) instead of the two posts above. The message is formatted with
+# STCMVF's value, change, premium, VIX, verb, and rate, followed by MTCMVF's value,
+# change, premium, verb, and rate.
+st_combine             = False
+st_combined_message    = """STCMVF settled @ {:.3f} ({:+.1%}), {:+.1%} over VIX ({:.3f}), {} speculators {:.2%} per day. MTCMVF settled @ {:.3f} ({:+.1%}), {:+.1%} over VIX, {} speculators {:.2%} per day."""
+st_combined_chart_file = 'combined_chart.png'
@@ -0,0 +1,193 @@
+"""
+Canned CBOE, Yahoo! Finance, and StockTwits responses for the tests, served through
+stand-ins for the `requests.Session` objects in cboe and cboe/bin/post.py.
+
+Contract prices are constant over each contract's life and rise by 0.5 per month of
+expiration (see contract_price), so continuous values can be worked out by hand.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import requests
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+
+import cboe
+
+contract_csv_header = b'CFE data is compiled for the convenience of site visitors and is furnished without responsibility for accuracy.\nTrade Date,Futures,Open,High,Low,Close,Settle,Change,Total Volume,EFP,Open Interest\n'
+contract_trading_days = pd.Timedelta(days=400) # How long before expiration a contract starts trading.
+
+def contract_price(expdate):
+    """Settlement price of the VX contract expiring on `expdate` (any trade date)."""
+    return(12.0 + 0.5*((expdate.year - 2023)*12 + expdate.month))
+#END: contract_price
+
+def contract_csv(expdate, today):
+    """
+    CSV of the VX contract expiring on `expdate` from CBOE's historical site, as
+    posted before `today`. Expired contracts include a row on the expiration date,
+    which cboe discards.
+    """
+    expdate     = pd.Timestamp(expdate)
+    price       = contract_price(expdate)
+    trade_dates = pd.date_range(start=expdate - contract_trading_days, end=min(expdate, today - pd.Timedelta(days=1)), freq=cboe.bday_us)
+    futures     = '{} ({:%b %Y})'.format(cboe.month_code[expdate.month], expdate)
+    lines       = [
+        '{:%Y-%m-%d},{},{p},{p},{p},{p},{p},0,1000,0,5000'.format(d, futures, p=price).encode('ascii')
+        for d in trade_dates
+        ]
+    return(contract_csv_header + b'\n'.join(lines) + b'\n')
+#END: contract_csv
+
+def settlement_csv(today, months=8):
+    """
+    CBOE's daily settlement CSV for `today`: monthly (VX/...) and weekly (VX##/...)
+    VX contracts among other products.
+    """
+    lines   = [b'Product,Symbol,Expiration Date,Price', b'IBHY,IBHY/K4,2024-05-01,100.125']
+    month   = today.replace(day=1)
+    monthly = 0
+    while(monthly < months):
+        expdate = cboe.vx_expiration_date(month.year, month.month)
+        if(expdate > today):
+            symbol = '{}{}'.format(cboe.month_code[expdate.month], expdate.year % 10)
+            lines.append('VX,VX/{},{:%Y-%m-%d},{}'.format(symbol, expdate, contract_price(expdate)).encode('ascii'))
+            if(monthly == 0): # Weeklies between the front and back months.
+                for week in (1, 2):
+                    weekly = today + pd.Timedelta(days=7*week)
+                    lines.append('VX,VX{:%W}/{},{:%Y-%m-%d},{}'.format(weekly, symbol, weekly, contract_price(expdate) - 0.1).encode('ascii'))
+            monthly += 1
+        month = month + pd.DateOffset(months=1)
+    lines.append(b'VXT,VXT/K4,2024-05-22,14.5')
+    return(b'\n'.join(lines) + b'\n')
+#END: settlement_csv
+
+def index_csv(dates, close):
+    """CBOE's historical index CSV (e.g., VIX_History.csv) with a constant close."""
+    lines = [b'Cboe Volatility Index (VIX) History', b'Data is provided as is.', b'DATE,OPEN,HIGH,LOW,CLOSE']
+    lines.extend('{:%m/%d/%Y},{c},{c},{c},{c}'.format(d, c=close).encode('ascii') for d in dates)
+    return(b'\n'.join(lines) + b'\n')
+#END: index_csv
+
+def yahoo_quote_page(index, price):
+    """Yahoo! Finance quote page carrying several fin-streamer elements for `index`."""
+    return((
+        '<html><body>'
+        '<fin-streamer class="price" data-symbol="^{i}" data-field="regularMarketPreviousClose" data-value="15.35">15.35</fin-streamer>'
+        '<fin-streamer class="price" data-symbol="^{i}" data-field="regularMarketChange" data-value="-0.35">-0.35</fin-streamer>'
+        '<fin-streamer class="price" data-field="regularMarketPrice" data-symbol="^{i}" data-value="{p}">{p:,.2f}</fin-streamer>'
+        '<fin-streamer class="price" data-symbol="^{i}" data-field="regularMarketDayHigh" data-value="99.00">99.00</fin-streamer>'
+        '</body></html>'
+        ).format(i=index, p=price).encode('ascii'))
+#END: yahoo_quote_page
+
+class FakeResponse(object):
+    """Minimal stand-in for requests.Response."""
+    def __init__(self, content, status_code=200):
+        self.content     = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if(self.status_code >= 400):
+            raise requests.HTTPError('{} Error'.format(self.status_code), response=self)
+
+    def json(self):
+        return(json.loads(self.content))
+#END: FakeResponse
+
+class FakeSession(object):
+    """
+    Stand-in for a requests.Session that serves canned responses by URL. A response
+    is either the content (bytes), a FakeResponse, an exception to raise, or a list
+    of those served in order. URLs of CBOE's historical VX contracts, daily settlement,
+    and index data are generated on demand for `today` unless given explicitly.
+    """
+    def __init__(self, responses=None, today=None, vix_dates=None, vix_close=15.0):
+        self.responses = dict(responses or {})
+        self.today     = today
+        self.vix_dates = vix_dates
+        self.vix_close = vix_close
+        self.urls      = [] # Requested URLs, in order.
+        self.posts     = [] # (url, data, files) of each POST, in order.
+
+    def canned(self, url):
+        if(url in self.responses):
+            outcome = self.responses[url]
+            if(isinstance(outcome, list)):
+                outcome = outcome.pop(0)
+            return(outcome)
+        contract_prefix = '{}/VX/VX_'.format(cboe.cboe_historical_base_url)
+        if(url.startswith(contract_prefix)):
+            return(contract_csv(pd.Timestamp(url[len(contract_prefix):-len('.csv')]), self.today))
+        if(url == '{}/csv?dt={:%Y-%m-%d}'.format(cboe.cboe_current_base_url, self.today)):
+            return(settlement_csv(self.today))
+        if(url.startswith(cboe.cboe_historical_index_base_url) and self.vix_dates is not None):
+            return(index_csv(self.vix_dates, self.vix_close))
+        return(FakeResponse(b'Not Found', status_code=404))
+
+    def respond(self, url):
+        outcome = self.canned(url)
+        if(isinstance(outcome, BaseException)):
+            raise outcome
+        if(isinstance(outcome, FakeResponse)):
+            return(outcome)
+        return(FakeResponse(outcome))
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return(self.respond(url))
+
+    def post(self, url, data=None, files=None, **kwargs):
+        self.urls.append(url)
+        self.posts.append((url, data, files))
+        return(self.respond(url))
+#END: FakeSession
+
+def stocktwits_response(status):
+    """StockTwits' JSON reply to a create-message request."""
+    return(FakeResponse(json.dumps({'response': {'status': status}}).encode('ascii')))
+#END: stocktwits_response
+
+class CBOETestCase(unittest.TestCase):
+    """
+    Pins the clock to 2024-05-01 18:00 (Chicago), after the day's settlement, runs in
+    a scratch directory (caches go to ./.data), and disables request delays.
+    """
+    today = pd.Timestamp('2024-05-01')
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.work_dir)
+        self.cache_dir = os.path.join(self.work_dir, '.data')
+        logging.disable(logging.CRITICAL) # Expected failures are logged with tracebacks.
+        self.addCleanup(logging.disable, logging.NOTSET)
+        for (name, value) in (
+                ('today',                      self.today),
+                ('now',                        self.today + pd.Timedelta(hours=18)),
+                ('last_posted_date',           self.today - pd.Timedelta(days=1)),
+                ('last_settled_date',          self.today),
+                ('cboe_daily_update_datetime', self.today + cboe.cboe_daily_update_time),
+                ('delay_sec',                  0),
+                ):
+            patcher = mock.patch.object(cboe, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use_session(self, responses=None, **kwargs):
+        session = FakeSession(responses, today=self.today, **kwargs)
+        patcher = mock.patch.object(cboe, 'session', session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return(session)
+#END: CBOETestCase
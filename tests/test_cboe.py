@@ -0,0 +1,262 @@
+"""Checks for the cboe package that run on canned CBOE data instead of the network."""
+
+import os
+import pickle
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import requests
+
+from cboe_fakes import CBOETestCase, settlement_csv, yahoo_quote_page
+import cboe
+
+class ReadCSVTest(CBOETestCase):
+    url = 'https://example.com/data.csv'
+
+    def test_line_filter(self):
+        self.use_session({self.url: settlement_csv(self.today)})
+        df = cboe.read_csv(self.url, line_filter=cboe.is_vx_settlement_line)
+        self.assertEqual(list(df.columns), ['Product', 'Symbol', 'Expiration Date', 'Price'])
+        self.assertEqual(set(df['Product']), {'VX'})
+        self.assertEqual(len(df), 10) # 8 monthlies and 2 weeklies
+    #END: test_line_filter
+
+    def test_is_vx_settlement_line(self):
+        self.assertTrue(cboe.is_vx_settlement_line(b'VX,VX/K4,2024-05-22,14.5'))
+        self.assertTrue(cboe.is_vx_settlement_line(b'"VX","VX/K4","2024-05-22","14.5"'))
+        self.assertFalse(cboe.is_vx_settlement_line(b'VXT,VXT/K4,2024-05-22,14.5'))
+        self.assertFalse(cboe.is_vx_settlement_line(b'IBHY,IBHY/K4,2024-05-01,100.125'))
+    #END: test_is_vx_settlement_line
+
+    def test_http_error(self):
+        self.use_session()
+        with self.assertRaises(requests.HTTPError):
+            cboe.read_csv(self.url)
+    #END: test_http_error
+#END: ReadCSVTest
+
+class Unpicklable(object):
+    def __reduce__(self):
+        raise ValueError('cannot pickle')
+#END: Unpicklable
+
+class CacheTest(CBOETestCase):
+    def test_round_trip(self):
+        df = pd.DataFrame({'Settle': [14.5, 15.25]}, index=pd.DatetimeIndex(['2024-04-30', '2024-05-01'], name='Trade Date'))
+        for ext in ('p', cboe.table_cache_ext):
+            cache_path = os.path.join(self.work_dir, 'df.{}'.format(ext))
+            cboe.write_cache(df, cache_path)
+            pd.testing.assert_frame_equal(cboe.read_cache(cache_path), df)
+            self.assertFalse(os.path.exists('{}.tmp'.format(cache_path)))
+    #END: test_round_trip
+
+    def test_failed_write_keeps_old_cache_and_removes_temporary_file(self):
+        cache_path = os.path.join(self.work_dir, 'df.p')
+        old_df     = pd.DataFrame({'Settle': [14.5]})
+        cboe.write_cache(old_df, cache_path)
+        with self.assertRaises(ValueError):
+            cboe.write_cache(pd.DataFrame({'Settle': [Unpicklable()]}), cache_path)
+        self.assertEqual(os.listdir(self.work_dir), ['df.p'])
+        pd.testing.assert_frame_equal(cboe.read_cache(cache_path), old_df)
+    #END: test_failed_write_keeps_old_cache_and_removes_temporary_file
+
+    def test_unreadable_cache(self):
+        cache_path = os.path.join(self.work_dir, 'df.p')
+        with open(cache_path, 'wb') as f:
+            f.write(pickle.dumps(pd.DataFrame())[:10]) # truncated
+        with self.assertRaises(cboe.cache_read_errors):
+            cboe.read_cache(cache_path)
+        with self.assertRaises(cboe.cache_read_errors):
+            cboe.read_cache(os.path.join(self.work_dir, 'missing.p'))
+    #END: test_unreadable_cache
+#END: CacheTest
+
+class IsCBOECacheCurrentTest(CBOETestCase):
+    def test_mtime_against_date(self):
+        cache_path = os.path.join(self.work_dir, 'VX_2024_05.p')
+        expdate    = pd.Timestamp('2024-05-22')
+        self.assertFalse(cboe.is_cboe_cache_current(expdate, cache_path)) # not cached
+        with open(cache_path, 'wb'):
+            pass
+        written = expdate.tz_localize('America/Chicago').timestamp()
+        os.utime(cache_path, (written - 60, written - 60))
+        self.assertFalse(cboe.is_cboe_cache_current(expdate, cache_path))
+        os.utime(cache_path, (written + 60, written + 60))
+        self.assertTrue(cboe.is_cboe_cache_current(expdate, cache_path))
+    #END: test_mtime_against_date
+#END: IsCBOECacheCurrentTest
+
+class ThrottleTest(CBOETestCase):
+    def test_requests_start_delay_sec_apart(self):
+        clock = [100.0]
+        def sleep(seconds):
+            clock[0] += seconds
+        fake_time = mock.Mock(monotonic=lambda: clock[0], sleep=sleep)
+        with mock.patch.object(cboe, 'time', fake_time), \
+                mock.patch.object(cboe, 'delay_sec', 1.0), \
+                mock.patch.object(cboe, 'last_request_sec', float('-inf')):
+            starts = []
+            for elapsed in (0.0, 0.25, 3.0):
+                clock[0] += elapsed
+                cboe.throttle()
+                starts.append(clock[0])
+        self.assertEqual(starts, [100.0, 101.0, 104.0])
+    #END: test_requests_start_delay_sec_apart
+#END: ThrottleTest
+
+class FetchVXDailySettlementTest(CBOETestCase):
+    csv_url = '{}/csv?dt=2024-05-01'.format(cboe.cboe_current_base_url)
+
+    def test_monthly_contracts(self):
+        self.use_session()
+        ds = cboe.fetch_vx_daily_settlement(cache=False)
+        self.assertEqual(list(ds['Symbol']), ['VX/K4', 'VX/M4', 'VX/N4', 'VX/Q4', 'VX/U4', 'VX/V4', 'VX/X4', 'VX/Z4'])
+        self.assertEqual(ds['Expiration Date'].iloc[0], pd.Timestamp('2024-05-22'))
+        self.assertEqual(list(ds['Price'][:2]), [20.5, 21.0])
+    #END: test_monthly_contracts
+
+    def test_retries_transient_failures(self):
+        session = self.use_session({self.csv_url: [
+            requests.ConnectionError('connection reset'),
+            requests.ReadTimeout('read timed out'),
+            settlement_csv(self.today),
+            ]})
+        ds = cboe.fetch_vx_daily_settlement(cache=False)
+        self.assertEqual(len(session.urls), 3)
+        self.assertEqual(len(ds), 8)
+    #END: test_retries_transient_failures
+
+    def test_gives_up_after_max_retries(self):
+        self.use_session({self.csv_url: [requests.ConnectionError('connection refused')]*cboe.max_retries})
+        with self.assertRaises(TimeoutError):
+            cboe.fetch_vx_daily_settlement(cache=False)
+    #END: test_gives_up_after_max_retries
+
+    def test_http_error_is_not_retried(self):
+        session = self.use_session({self.csv_url: [requests.HTTPError('404 Error'), settlement_csv(self.today)]})
+        with self.assertRaises(requests.HTTPError):
+            cboe.fetch_vx_daily_settlement(cache=False)
+        self.assertEqual(len(session.urls), 1)
+    #END: test_http_error_is_not_retried
+
+    def test_incomplete_settlement_is_not_cached(self):
+        self.use_session({self.csv_url: settlement_csv(self.today, months=3)})
+        with self.assertRaises(IndexError):
+            cboe.fetch_vx_daily_settlement(cache_dir=self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+    #END: test_incomplete_settlement_is_not_cached
+
+    def test_cache(self):
+        os.mkdir(self.cache_dir)
+        stale_path = os.path.join(self.cache_dir, 'VX_settlement_2024_04_30.{}'.format(cboe.cache_ext))
+        with open(stale_path, 'wb'):
+            pass
+        session = self.use_session()
+        ds = cboe.fetch_vx_daily_settlement(cache_dir=self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir), ['VX_settlement_2024_05_01.{}'.format(cboe.cache_ext)]) # earlier days pruned
+        # Same-day rerun is served from cache.
+        pd.testing.assert_frame_equal(
+            cboe.fetch_vx_daily_settlement(cache_dir=self.cache_dir).reset_index(drop=True),
+            ds.reset_index(drop=True))
+        self.assertEqual(len(session.urls), 1)
+    #END: test_cache
+
+    def test_cache_written_before_settlement_is_refreshed(self):
+        session    = self.use_session()
+        cache_path = os.path.join(self.cache_dir, 'VX_settlement_2024_05_01.{}'.format(cboe.cache_ext))
+        cboe.fetch_vx_daily_settlement(cache_dir=self.cache_dir)
+        written = (cboe.cboe_daily_update_datetime - pd.Timedelta(hours=1)).tz_localize('America/Chicago').timestamp()
+        os.utime(cache_path, (written, written))
+        cboe.fetch_vx_daily_settlement(cache_dir=self.cache_dir)
+        self.assertEqual(len(session.urls), 2)
+    #END: test_cache_written_before_settlement_is_refreshed
+#END: FetchVXDailySettlementTest
+
+class BuildContinuousVXDataframeTest(CBOETestCase):
+    def setUp(self):
+        super().setUp()
+        self.session          = self.use_session()
+        period                = pd.date_range(start='2024-03-01', end=self.today, freq=cboe.bday_us)
+        self.vx_contract_df   = cboe.fetch_vx_contracts(period)
+        self.vx_continuous_df = cboe.build_continuous_vx_dataframe(self.vx_contract_df)
+
+    def test_contracts(self):
+        # Historical contracts plus today's settlement values; rows at or past expiration are discarded.
+        self.assertTrue((self.vx_contract_df['Expiration Date'] > self.vx_contract_df.index).all())
+        self.assertEqual(list(self.vx_contract_df.loc[self.today, 'Settle']), [20.5, 21.0, 21.5, 22.0, 22.5, 23.0, 23.5, 24.0])
+        self.assertTrue(os.path.isfile(os.path.join('.data', 'VX_2024_05.{}'.format(cboe.cache_ext))))
+    #END: test_contracts
+
+    def test_expired_contracts_come_from_cache(self):
+        written = (cboe.now).tz_localize('America/Chicago').timestamp() # Caches as if written on the pinned clock.
+        for name in os.listdir('.data'):
+            os.utime(os.path.join('.data', name), (written, written))
+        requests_made = len(self.session.urls)
+        cboe.fetch_vx_contracts(pd.date_range(start='2024-03-01', end='2024-04-30', freq=cboe.bday_us))
+        refetched = [url for url in self.session.urls[requests_made:] if '/VX/VX_' in url]
+        self.assertEqual(sorted(refetched), sorted(
+            '{}/VX/VX_{:%Y-%m-%d}.csv'.format(cboe.cboe_historical_base_url, cboe.vx_expiration_date(2024, month))
+            for month in range(5, 13)
+            ))
+    #END: test_expired_contracts_come_from_cache
+
+    def test_weights_and_constant_maturity_values(self):
+        # On 2024-04-24, the roll period runs from the April (04-17) to the May (05-22)
+        # expiration: 25 business days, 19 of which remain after that day.
+        row = self.vx_continuous_df.loc['2024-04-24']
+        self.assertEqual(row['Month0 Expiration Date'], pd.Timestamp('2024-04-17'))
+        self.assertEqual(row['Month1 Expiration Date'], pd.Timestamp('2024-05-22'))
+        self.assertEqual(row['Roll Period'], 25)
+        self.assertEqual(row['Days Till Rollover'], 19)
+        self.assertAlmostEqual(row['ST Month1 Weight'], 0.76)
+        self.assertAlmostEqual(row['STCMVF'], 0.76*20.5 + 0.24*21.0)
+        self.assertAlmostEqual(row['MTCMVF'], (0.76/3)*22.0 + (22.5 + 23.0)/3 + (1/3 - 0.76/3)*23.5)
+    #END: test_weights_and_constant_maturity_values
+
+    def test_today(self):
+        row = self.vx_continuous_df.loc[self.today]
+        self.assertEqual(row['Days Till Rollover'], 14)
+        self.assertAlmostEqual(row['STCMVF'], 0.56*20.5 + 0.44*21.0)
+        self.assertFalse(np.isnan(self.vx_continuous_df[['STCMVF', 'MTCMVF']].values).any())
+    #END: test_today
+#END: BuildContinuousVXDataframeTest
+
+class FetchIndexTest(CBOETestCase):
+    yahoo_url = 'https://finance.yahoo.com/quote/%5EVIX'
+
+    def test_history_includes_today(self):
+        session  = self.use_session(vix_dates=pd.date_range(start='2024-04-01', end=self.today, freq=cboe.bday_us))
+        index_df = cboe.fetch_index('VIX')
+        self.assertEqual(index_df.index[-1], self.today)
+        self.assertNotIn(self.yahoo_url, session.urls)
+    #END: test_history_includes_today
+
+    def test_today_from_yahoo(self):
+        # The quote page has several fields for ^VIX; only regularMarketPrice is the last price.
+        session  = self.use_session({self.yahoo_url: yahoo_quote_page('VIX', 1234.5)},
+                vix_dates=pd.date_range(start='2024-04-01', end=self.today - pd.Timedelta(days=1), freq=cboe.bday_us))
+        index_df = cboe.fetch_index('VIX')
+        self.assertEqual(index_df.index[-1], self.today)
+        self.assertEqual(index_df['Close'].iloc[-1], 1234.5)
+        self.assertEqual(index_df['Close'].iloc[-2], 15.0)
+        self.assertIn(self.yahoo_url, session.urls)
+    #END: test_today_from_yahoo
+#END: FetchIndexTest
+
+class VXExpirationDateTest(unittest.TestCase):
+    def test_expiration_dates(self):
+        self.assertEqual(cboe.vx_expiration_date(2024, 5), pd.Timestamp('2024-05-22'))
+        # Friday 30 days after the regular Wednesday is Juneteenth: settle the business day before.
+        self.assertEqual(cboe.vx_expiration_date(2024, 6), pd.Timestamp('2024-06-18'))
+    #END: test_expiration_dates
+
+    def test_same_unit_on_holiday_branch(self):
+        self.assertEqual(cboe.vx_expiration_date(2024, 5).unit, 'ns')
+        self.assertEqual(cboe.vx_expiration_date(2024, 6).unit, 'ns')
+    #END: test_same_unit_on_holiday_branch
+#END: VXExpirationDateTest
+
+if(__name__ == '__main__'):
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Checks for cboe/bin/post.py that run on canned CBOE data instead of the network."""
+
+import importlib
+import logging
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+import pandas as pd
+import requests
+
+from cboe_fakes import CBOETestCase, FakeSession, repo_dir, stocktwits_response
+import cboe
+
+sys.path.insert(0, os.path.join(repo_dir, 'cboe', 'bin'))
+
+# post.py imports the user's settings module; provide one for the tests.
+settings = types.ModuleType('settings')
+settings.st_years               = 1
+settings.st_histogram_xstep     = 5.0
+settings.mt_years               = 1
+settings.mt_histogram_xstep     = 10.0
+settings.check_for_holiday      = False
+settings.export_excel           = False
+settings.st_dry_run             = True
+settings.st_access_token        = 'token'
+settings.st_st_message          = 'ST {:.3f} {:+.1%} {:+.1%} {:.3f} {} {:.2%}'
+settings.st_post_st_chart       = True
+settings.st_st_chart_file       = 'st_chart.png'
+settings.st_mt_message          = 'MT {:.3f} {:+.1%} {:+.1%} {:.3f} {} {:.2%}'
+settings.st_post_mt_chart       = True
+settings.st_mt_chart_file       = 'mt_chart.png'
+settings.st_combine             = True
+settings.st_combined_message    = 'ST {:.3f} {:+.1%} {:+.1%} {:.3f} {} {:.2%} MT {:.3f} {:+.1%} {:+.1%} {} {:.2%}'
+settings.st_combined_chart_file = 'combined_chart.png'
+sys.modules['settings'] = settings
+
+post = importlib.import_module('post')
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    have_matplotlib = True
+except ImportError:
+    have_matplotlib = False
+
+@unittest.skipUnless(have_matplotlib, 'charts need matplotlib')
+class MainTest(CBOETestCase):
+    """Runs post.main end to end on canned CBOE data, with StockTwits in dry-run mode."""
+    stcmvf_today = '20.720' # 0.56*20.5 + 0.44*21.0; 14 of 25 days left in the roll period.
+
+    def run_main(self, session=None, **setting_values):
+        if(session is None):
+            session = self.use_session(vix_dates=pd.date_range(start=self.today - pd.Timedelta(days=800), end=self.today, freq=cboe.bday_us))
+        self.session = session
+        with mock.patch.multiple(settings, st_dry_run=True, **setting_values), \
+                mock.patch.object(post, 'post_to_stocktwits', wraps=post.post_to_stocktwits) as post_to_stocktwits:
+            post.main()
+        return(post_to_stocktwits)
+    #END: run_main
+
+    def assertChart(self, attachment, filename):
+        (name, body, mime_type) = attachment
+        self.assertEqual((name, mime_type), (filename, 'image/png'))
+        self.assertTrue(body.startswith(b'\x89PNG'))
+    #END: assertChart
+
+    def test_combined_post_with_both_charts(self):
+        post_to_stocktwits = self.run_main(st_combine=True)
+        post_to_stocktwits.assert_called_once()
+        (access_token, message) = post_to_stocktwits.call_args.args
+        self.assertTrue(message.startswith('ST {} '.format(self.stcmvf_today)))
+        self.assertIn(' 15.000 ', message) # VIX
+        self.assertChart(post_to_stocktwits.call_args.kwargs['attachment'], settings.st_combined_chart_file)
+        self.assertFalse(self.session.posts) # Dry run.
+    #END: test_combined_post_with_both_charts
+
+    def test_separate_posts(self):
+        post_to_stocktwits = self.run_main(st_combine=False)
+        self.assertEqual(post_to_stocktwits.call_count, 2)
+        (st_call, mt_call) = post_to_stocktwits.call_args_list
+        self.assertTrue(st_call.args[1].startswith('ST {} '.format(self.stcmvf_today)))
+        self.assertTrue(mt_call.args[1].startswith('MT '))
+        self.assertChart(st_call.kwargs['attachment'], settings.st_st_chart_file)
+        self.assertChart(mt_call.kwargs['attachment'], settings.st_mt_chart_file)
+    #END: test_separate_posts
+
+    def test_no_post_without_vix(self):
+        # Continuous data cached by yesterday's run, VIX included.
+        session = self.use_session() # Serves no index data.
+        period  = pd.date_range(start=self.today - pd.Timedelta(days=365), end=self.today - pd.Timedelta(days=1), freq=cboe.bday_us)
+        cache_vx_continuous_df = cboe.build_continuous_vx_dataframe(cboe.fetch_vx_contracts(period))
+        cache_vx_continuous_df['VIX'] = 15.0
+        cboe.write_cache(cache_vx_continuous_df, '.data/{}'.format(cboe.vx_continuous_df_cache_file))
+        post_to_stocktwits = self.run_main(session)
+        post_to_stocktwits.assert_not_called()
+    #END: test_no_post_without_vix
+#END: MainTest
+
+class PostToStockTwitsTest(unittest.TestCase):
+    """Posts through a FakeSession standing in for StockTwits' API."""
+    url = post.stocktwits_create_message_url
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL) # Expected failures are logged with tracebacks.
+        self.addCleanup(logging.disable, logging.NOTSET)
+        patcher = mock.patch.object(post.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_posts_attachment(self):
+        session = FakeSession({self.url: stocktwits_response(200)})
+        post.post_to_stocktwits('token', 'message', attachment=('chart.png', b'\x89PNG', 'image/png'), session=session)
+        ((url, data, files),) = session.posts
+        self.assertEqual(data, {'access_token': 'token', 'body': 'message'})
+        self.assertEqual(files, {'chart': ('chart.png', b'\x89PNG', 'image/png')})
+    #END: test_posts_attachment
+
+    def test_retries_server_errors(self):
+        session = FakeSession({self.url: [stocktwits_response(503), requests.ConnectionError('reset'), stocktwits_response(200)]})
+        post.post_to_stocktwits('token', 'message', session=session)
+        self.assertEqual(len(session.posts), 3)
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [1, 2])
+    #END: test_retries_server_errors
+
+    def test_rejection_is_not_retried(self):
+        session = FakeSession({self.url: [stocktwits_response(401), stocktwits_response(200)]})
+        with self.assertRaises(Exception):
+            post.post_to_stocktwits('token', 'message', session=session)
+        self.assertEqual(len(session.posts), 1)
+    #END: test_rejection_is_not_retried
+
+    def test_gives_up(self):
+        session = FakeSession({self.url: [requests.ConnectionError('reset')]*post.max_post_attempts})
+        with self.assertRaises(TimeoutError):
+            post.post_to_stocktwits('token', 'message', session=session)
+        self.assertEqual(len(session.posts), post.max_post_attempts)
+    #END: test_gives_up
+
+    def test_dry_run(self):
+        session = FakeSession()
+        post.post_to_stocktwits('token', 'message', dry_run=True, session=session)
+        self.assertFalse(session.posts)
+    #END: test_dry_run
+#END: PostToStockTwitsTest
+
+if(__name__ == '__main__'):
+    unittest.main()